@@ -1,12 +1,12 @@
 import os
 
 from assembler import codegen
-from nandcomp.computer import Computer
+from nandcomp.computer import Computer, Until
 
 sum100 = os.path.join('..', 'examples', 'add100.asm')
 image = codegen.create(sum100)
 
-computer = Computer(image)
-for _ in range(1500):
-    next_address, next_ir = computer()
-    print(computer.RAM.memory[17])
+computer = Computer(image, sparse=True)
+stop = computer.run(5000, Until(halt=True))
+print(stop)
+print(computer.RAM.peek(17))
@@ -25,7 +25,10 @@ x_or_y_op    = (0, 1, 0, 1, 0, 1)
 
 
 class ALU(gate.Device):
-    def __init__(self):
+    def __init__(self, adder=ops.FullAdd16Bit):
+        """
+        :param adder: 16 bit adder class, e.g. ops.KoggeStone16Bit (see ops.report)
+        """
         self.xs = None
         self.ys = None
         self.flags = None
@@ -38,7 +41,7 @@ class ALU(gate.Device):
 
         self.inverters = [gate.BitwiseOp1(gate.Not) for _ in range(3)]
         self.is_zero = ops.IsZero()
-        self.adder = ops.FullAdd16Bit()
+        self.adder = adder()
         self.is_negative = ops.IsNegative()
 
         self.mux2_zx = gate.Multiplexer2()
@@ -51,10 +54,10 @@ class ALU(gate.Device):
         self.mux2_negate = gate.Multiplexer2()
 
     def _wiring(self):
-        xs = self.mux2_zx(self.xs, [0] * 16, self.flags.zx)
+        xs = self.mux2_zx(self.xs, gate.ZERO, self.flags.zx)
         xs = self.mux2_nx(xs, self.inverters[0](xs), self.flags.nx)
 
-        ys = self.mux2_zy(self.ys, [0] * 16, self.flags.zy)
+        ys = self.mux2_zy(self.ys, gate.ZERO, self.flags.zy)
         ys = self.mux2_ny(ys, self.inverters[1](ys), self.flags.ny)
 
         add_ = self.adder(xs, ys)
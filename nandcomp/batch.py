@@ -0,0 +1,142 @@
+"""
+Runs many programs through computer.Computer on a process pool.
+
+Every worker process builds one Computer and reboots it for each program,
+the results are yielded as the runs finish (not in submission order).
+
+    for result in batch.run(['examples/add100.asm', image], cycles=2000, addresses=[16, 17]):
+        print(result.index, result.ram)
+
+    python -m nandcomp.batch examples/*.asm --cycles 2000 --address 16 --address 17
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+from collections import namedtuple
+
+from nandcomp import computer
+from nandcomp import utils
+
+# ram: {address: signed value}, cycles: run (fewer than asked when the program halted),
+# error: None or the message of the exception the run raised
+Result = namedtuple('Result', ['index', 'source', 'ram', 'pc', 'cycles', 'seconds', 'error'])
+
+_computer = None  # the Computer of the worker process
+
+
+def load(program):
+    """
+    .asm path, or a ROM image (list of 16 bit lists or ints) --> ROM image
+    """
+    if isinstance(program, (str, os.PathLike)):
+        from assembler import codegen
+        return codegen.create(os.fspath(program))
+    return [utils.to_machine_number(word) if isinstance(word, int) else word for word in program]
+
+
+def _start_worker(compiled, sparse):
+    global _computer
+    _computer = computer.Computer([], compiled=compiled, sparse=sparse)
+
+
+def _run(index, program, cycles, addresses):
+    start = time.perf_counter()
+    source = os.fspath(program) if isinstance(program, (str, os.PathLike)) else None
+    try:
+        _computer.reboot(load(program))
+        stop = _computer.run(cycles, computer.Until())
+    except Exception as e:
+        return Result(index, source, {}, None, 0, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+
+    ram = {address: utils.to_integer(utils.to_machine_number(_computer.RAM.peek(address))) for address in addresses}
+    pc = utils.to_integer(_computer.PC_bus) & 0xFFFF
+    return Result(index, source, ram, pc, stop.cycles, time.perf_counter() - start, None)
+
+
+def run(programs, cycles, addresses=(), workers=None, compiled=True, sparse=True):
+    """
+    yields a Result per program, as they finish
+
+    :param programs: .asm paths or ROM images
+    :param cycles: steps per program, fewer when it halts (see computer.halts)
+    :param addresses: RAM addresses read at the end of each run
+    :param workers: processes, os.cpu_count() by default
+    :param compiled, sparse: see computer.Computer
+    """
+    addresses = list(addresses)
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_start_worker,
+                                                initargs=(compiled, sparse)) as pool:
+        futures = [pool.submit(_run, idx, program, cycles, addresses) for idx, program in enumerate(programs)]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='runs .asm programs on the nand computer, in parallel')
+    parser.add_argument('programs', nargs='+', help='.asm files')
+    parser.add_argument('--cycles', type=int, default=1000, help='steps per program')
+    parser.add_argument('--address', type=int, action='append', default=[], help='RAM address to report')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: cpu count)')
+    parser.add_argument('--gates', action='store_true', help='run the gate level CPU, not the compiled one')
+    parser.add_argument('--eager', action='store_true', help='build every memory register upfront')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    cycles = 0
+    start = time.perf_counter()
+    for result in run(args.programs, args.cycles, args.address, args.workers, not args.gates, not args.eager):
+        if result.error:
+            failed += 1
+            print(f'{result.source}: {result.error}')
+        else:
+            ram = ' '.join(f'RAM[{a}]={v}' for a, v in result.ram.items())
+            print(f'{result.source}: PC={result.pc} {ram} ({result.cycles} cycles, {result.seconds:.2f}s)')
+        cycles += result.cycles
+    elapsed = time.perf_counter() - start
+    print(f'{len(args.programs)} programs, {failed} failed, {cycles / elapsed:.0f} cycles/s')
+    return 1 if failed else 0
+
+
+def _batch_test():
+    # counts down RAM[16] from 5, then loops forever on @0, 0;JMP (not a halt: the cycles all run)
+    countdown = [
+        0b0000000000000101,  # 0   @5
+        0b1110110000010000,  # 1   D = A
+        0b0000000000010000,  # 2   @16
+        0b1110001100001000,  # 3   M = D
+        0b0000000000010000,  # 4   @16     (4)
+        0b1111110010011000,  # 5   MD = M - 1
+        0b0000000000000100,  # 6   @4
+        0b1110001100000101,  # 7   D;JNE
+        0b0000000000000000,  # 8   @0
+        0b1110101010000111,  # 9   0;JMP
+    ]
+    programs = [computer.SUM100, countdown]
+    addresses = [16, 17]
+    cycles = 2000
+
+    results = sorted(run(programs, cycles, addresses, workers=2), key=lambda result: result.index)
+    assert [result.index for result in results] == [0, 1] and not any(result.error for result in results)
+    for program, result in zip(programs, results):
+        serial = computer.Computer(load(program), compiled=True, sparse=True)
+        stop = serial.run(cycles, computer.Until())
+        assert result.cycles == stop.cycles
+        assert result.pc == utils.to_integer(serial.PC_bus) & 0xFFFF
+        assert result.ram == {address: utils.to_integer(utils.to_machine_number(serial.RAM.peek(address)))
+                              for address in addresses}
+    assert results[0].ram[17] == 5050 and results[0].cycles < cycles
+    assert results[1].cycles == cycles
+
+
+if __name__ == '__main__':
+    # through the package, so the workers unpickle nandcomp.batch and not __main__
+    from nandcomp import batch
+    if len(sys.argv) > 1:
+        raise SystemExit(batch.main())
+    batch._batch_test()
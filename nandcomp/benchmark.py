@@ -0,0 +1,286 @@
+"""
+Benchmarks of the gates, the ALU, the memories and whole programs, as JSON numbers.
+
+    python -m nandcomp.benchmark                                  # run, print the results
+    python -m nandcomp.benchmark --output results.json            # ... and save them
+    python -m nandcomp.benchmark --baseline benchmarks/baseline.json
+
+With a baseline the results are compared to it, a result worse by more than the tolerance is a regression
+(exit code 1). Every timing is the best of a few repeats, with fixed random inputs.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from nandcomp import alu
+from nandcomp import computer
+from nandcomp import gate
+from nandcomp import memory
+from nandcomp import ops
+from nandcomp import utils
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+REPEATS = 5
+MIN_RUN = 0.2  # seconds a timed run of the short benchmarks lasts at least, so the timer noise stays small
+
+_benchmarks = []
+
+
+def benchmark(unit, higher_is_better=True, slow=False):
+    """
+    registers a function returning the measured value
+    """
+    def register(function):
+        _benchmarks.append((function.__name__, unit, higher_is_better, slow, function))
+        return function
+    return register
+
+
+def _best(function, repeats=REPEATS):
+    """
+    the shortest of the runs, in seconds, without garbage collections (as timeit):
+    a full collection through the cells of a filled memory would land in a random run
+    """
+    best = None
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def _calls_per_second(device, inputs):
+    def run():
+        for args in inputs:
+            device(*args)
+    return len(inputs) / _best(run)
+
+
+@benchmark('calls/s')
+def nand():
+    return _calls_per_second(gate.Nand(), [(x, y) for x in (0, 1) for y in (0, 1)] * 5000)
+
+
+@benchmark('calls/s')
+def xor():
+    return _calls_per_second(gate.Xor(), [(x, y) for x in (0, 1) for y in (0, 1)] * 1000)
+
+
+@benchmark('calls/s')
+def full_add():
+    return _calls_per_second(ops.FullAdd(), [(x, y, c) for x in (0, 1) for y in (0, 1) for c in (0, 1)] * 250)
+
+
+@benchmark('ops/s')
+def alu_ops():
+    rng = random.Random(0)
+    flags = [alu.AluFlag(*getattr(alu, name)) for name in sorted(dir(alu)) if name.endswith('_op')]
+    operands = [(utils.to_machine_number(rng.randint(-2**15, 2**15 - 1)),
+                 utils.to_machine_number(rng.randint(-2**15, 2**15 - 1))) for _ in range(10)]
+    return _calls_per_second(alu.ALU(), [(xs, ys, f) for f in flags for xs, ys in operands])
+
+
+def _rounds(function):
+    """
+    how many calls of function make a timed run of MIN_RUN seconds
+    """
+    start = time.perf_counter()
+    function()
+    return max(1, math.ceil(MIN_RUN / max(time.perf_counter() - start, 1e-9)))
+
+
+def _memory_throughput(ram, write):
+    rng = random.Random(0)
+    accesses = [(utils.to_machine_number(rng.randrange(2**15)), utils.to_machine_number(rng.randrange(2**16)))
+                for _ in range(500)]
+    # the words are read back from real cells, not from the shared zeros of an untouched sparse memory
+    for address, data in accesses:
+        ram(address, data, 1)
+
+    def once():
+        for address, data in accesses:
+            ram(address, data, write)
+    rounds = _rounds(once)
+
+    def run():
+        for _ in range(rounds):
+            once()
+    return rounds * len(accesses) / _best(run)
+
+
+@benchmark('words/s')
+def ram_read():
+    return _memory_throughput(memory.RAM(sparse=True), 0)
+
+
+@benchmark('words/s')
+def ram_write():
+    return _memory_throughput(memory.RAM(sparse=True), 1)
+
+
+@benchmark('words/s')
+def array_ram_write():
+    return _memory_throughput(memory.ArrayRAM(), 1)
+
+
+def _python(code):
+    """
+    the output of code run by a new interpreter, which imports this nandcomp
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+
+
+def _build(sparse):
+    """
+    builds a Computer in a new interpreter, so its peak RSS is its own: (seconds, peak RSS in MB).
+    The peak is VmHWM where there is one: ru_maxrss survives the exec, it starts from the peak of this process.
+    """
+    code = (
+        'import resource, time\n'
+        'from nandcomp import computer\n'
+        'start = time.perf_counter()\n'
+        f'computer.Computer([], sparse={sparse})\n'
+        'seconds = time.perf_counter() - start\n'
+        'try:\n'
+        '    rss = int(open("/proc/self/status").read().split("VmHWM:")[1].split()[0]) / 1024\n'
+        'except (OSError, IndexError):\n'
+        '    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n'
+        'print(seconds, rss)\n'
+    )
+    seconds, rss = _python(code).split()
+    return float(seconds), float(rss)
+
+
+@benchmark('s', higher_is_better=False)
+def computer_build_sparse():
+    return _build(True)[0]
+
+
+@benchmark('MB', higher_is_better=False)
+def computer_rss_sparse():
+    return _build(True)[1]
+
+
+@benchmark('s', higher_is_better=False, slow=True)
+def computer_build_eager():
+    return _build(False)[0]
+
+
+@benchmark('MB', higher_is_better=False, slow=True)
+def computer_rss_eager():
+    return _build(False)[1]
+
+
+def _instructions_per_second(name, cycles, compiled=False):
+    from assembler import codegen
+
+    image = codegen.create(os.path.join(EXAMPLES, name))
+    machine = computer.Computer(image, compiled=compiled, sparse=True)
+
+    def run():
+        machine.reboot(image)
+        for _ in range(cycles):
+            machine.step()
+    return cycles / _best(run)
+
+
+@benchmark('instructions/s')
+def add100():
+    return _instructions_per_second('add100.asm', 300)
+
+
+@benchmark('instructions/s')
+def add2():
+    return _instructions_per_second('add2.asm', 300)
+
+
+@benchmark('instructions/s')
+def add100_compiled():
+    return _instructions_per_second('add100.asm', 3000, compiled=True)
+
+
+def run(names=None, slow=True):
+    """
+    {name: {'value', 'unit', 'higher_is_better'}} of the benchmarks (all of them by default).
+    Every benchmark runs in a new interpreter: the objects and the specialized code the earlier ones leave behind
+    (e.g. the gates full_add calls, which the memory cells call too) would change its timing.
+    """
+    results = {}
+    for name, unit, higher_is_better, is_slow, function in _benchmarks:
+        if (names and name not in names) or (is_slow and not slow):
+            continue
+        value = float(_python(f'from nandcomp import benchmark; print(repr(benchmark.{name}()))'))
+        results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    (name, value, baseline value, change, regression) rows for the results in the baseline,
+    change > 0 is an improvement
+    """
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        value, reference = result['value'], baseline[name]['value']
+        change = (value - reference) / reference if reference else 0.0
+        if not result['higher_is_better']:
+            change = -change
+        rows.append((name, value, reference, change, change < -tolerance))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='nandcomp benchmarks')
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='skip the slow ones (eager memory build)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file of earlier results to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative slowdown counted as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, slow=not args.quick)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if not args.baseline:
+        for name, result in results.items():
+            print(f'{name:24}{result["value"]:14.4g} {result["unit"]}')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = 0
+    for name, value, reference, change, regression in compare(results, baseline, args.tolerance):
+        regressions += regression
+        flag = '  REGRESSION' if regression else ''
+        print(f'{name:24}{value:14.4g}{reference:14.4g}{change:+9.1%}{flag}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,30 +1,153 @@
 import threading
 import time
 
+from nandcomp import event
+
 
 class Circuit:
-    def __init__(self, clock_speed, device, *args):
+    # most steps run in one go when behind schedule, or free running, before looking at pause / stop again
+    batch = 256
+
+    def __init__(self, clock_speed, device, *args, event_driven=False):
         """
-        :param clock_speed: tick per second (Hz)
+        :param clock_speed: tick per second (Hz), None to run as fast as possible
+        :param event_driven: only evaluate the components whose inputs changed (see event.py)
         """
         self.clock_speed = clock_speed
         self.device = device(*args)
+        self.event_driven = event_driven
+        self.cycles = 0
         self.thread = None
         self.is_on = False
+        self.error = None  # the exception a step raised, which stopped the clock
+
+        self._stop = threading.Event()
+        self._running = threading.Event()  # cleared while paused
+        self._stepping = threading.Lock()  # held through every step
+        self._started = None
+        self._halted_at = None  # paused or powered off since
+        self._paused = 0.0  # seconds spent paused
+        self._enabled_events = False  # event mode turned on by power_on, so off again by power_off
 
     def power_on(self, show_step=False):
         self.is_on = True
+        self.error = None
+        self._stop.clear()
+        self._running.set()
+        self.cycles = 0
+        self._started = time.perf_counter()
+        self._halted_at = None
+        self._paused = 0.0
+        if self.event_driven:
+            self._enabled_events = not event.enabled()
+            event.enable()
+            event.counter.reset()
 
-        def _loop():
-            while self.is_on:
-                time.sleep(1 / self.clock_speed)
-                self.device.step()
+        def _steps(n):
+            for _ in range(n):
+                if not self._running.is_set():
+                    break
+                with self._stepping:
+                    self.device.step()
+                    self.cycles += 1
                 if show_step:
                     print(self.device.res)
 
-        self.thread = threading.Thread(target=_loop)
+        def _loop():
+            while not self._stop.is_set():
+                if not self._running.is_set():
+                    self._running.wait()
+                    continue
+
+                if self.clock_speed is None:
+                    _steps(self.batch)
+                    continue
+
+                # cycle n is due at (n + 1) / clock_speed on the absolute schedule, so the sleep errors do not add up
+                due = int(self.elapsed * self.clock_speed) - self.cycles
+                if due > 0:
+                    _steps(min(due, self.batch))
+                else:
+                    self._stop.wait((self.cycles + 1 - self.elapsed * self.clock_speed) / self.clock_speed)
+
+        def _run():
+            try:
+                _loop()
+            except Exception as e:
+                # raised again by power_off
+                self.error = e
+                self.is_on = False
+
+        self.thread = threading.Thread(target=_run)
         self.thread.start()
 
+    def pause(self):
+        """
+        returns once the step in progress is done, no step runs until resume()
+        """
+        if self._running.is_set():
+            self._running.clear()
+            with self._stepping:
+                self._halted_at = time.perf_counter()
+
+    def resume(self):
+        """
+        does nothing unless paused, e.g. before power_on
+        """
+        if not self._running.is_set() and self._halted_at is not None:
+            self._paused += time.perf_counter() - self._halted_at
+            self._halted_at = None
+            self._running.set()
+
     def power_off(self):
+        """
+        stops the clock, raises the exception of the step that stopped it if any
+        """
         self.is_on = False
+        self._stop.set()
+        self.resume()
         self.thread.join()
+        self._halted_at = time.perf_counter()
+        if self._enabled_events:
+            self._enabled_events = False
+            event.disable()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def elapsed(self):
+        """
+        seconds powered on, not counting the pauses
+        """
+        if self._started is None:
+            return 0.0
+        now = time.perf_counter() if self._halted_at is None else self._halted_at
+        return now - self._started - self._paused
+
+    @property
+    def hz(self):
+        """
+        the achieved clock speed
+        """
+        elapsed = self.elapsed
+        return self.cycles / elapsed if elapsed else 0.0
+
+    @property
+    def lag(self):
+        """
+        cycles behind the schedule of clock_speed
+        """
+        if self.clock_speed is None:
+            return 0
+        return max(int(self.elapsed * self.clock_speed) - self.cycles, 0)
+
+    @property
+    def evaluated_fraction(self):
+        """
+        nands evaluated / nands of the full evaluation, since power on (event driven only)
+        """
+        return event.counter.fraction
+
+    @property
+    def nands_per_cycle(self):
+        return event.counter.evaluated / self.cycles if self.cycles else 0
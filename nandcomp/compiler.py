@@ -0,0 +1,349 @@
+import copy
+
+from nandcomp import gate
+from nandcomp import hooks
+
+
+class Wire:
+    """
+    A symbolic signal, used instead of the 0/1 ints while tracing a device.
+    Nand._wiring computes `1 - (x & y)`, so those are the only operations a wire supports.
+    """
+    __slots__ = ('netlist', 'node')
+
+    def __init__(self, netlist, node):
+        self.netlist = netlist
+        self.node = node
+
+    def __and__(self, other):
+        if isinstance(other, Wire):
+            return _Conjunction(self, other)
+        if other == 0:
+            return 0
+        if other == 1:
+            return self
+        raise TypeError(f'can not trace: wire & {other!r}')
+
+    __rand__ = __and__
+
+    def __rsub__(self, other):
+        if other != 1:
+            raise TypeError(f'can not trace: {other!r} - wire')
+        return self.netlist.nand(self.node, self.node)
+
+    def __bool__(self):
+        raise TypeError('can not trace: branching on a wire')
+
+
+class _Conjunction:
+    __slots__ = ('a', 'b')
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+    def __rsub__(self, other):
+        if other != 1:
+            raise TypeError(f'can not trace: {other!r} - (wire & wire)')
+        return self.a.netlist.nand(self.a.node, self.b.node)
+
+
+class Netlist:
+    """
+    A device flattened to nand gates.
+
+    nodes[i] is None for a source (an input or a state bit), else the (a, b) pair of a nand.
+    Operands always precede the gate, so the node order is a topological order.
+    """
+    def __init__(self):
+        self.nodes = []
+        self.names = []
+        self._gates = {}
+
+        self.inputs = None   # args of the device call, with Wires in place of the bits
+        self.outputs = None  # result of the device call, with Wires in place of the bits
+        self.state = []      # (source node, next value) pairs
+        self.initial = []    # value of each state bit at the time of the trace
+        self.origins = {}    # nand node -> path of the Nand device it came from, see trace(origins=True)
+
+    def source(self, name):
+        self.nodes.append(None)
+        self.names.append(name)
+        return Wire(self, len(self.nodes) - 1)
+
+    def nand(self, a, b):
+        if a > b:
+            a, b = b, a
+
+        # not(not(x)) is x
+        if a == b and self.nodes[a] is not None and self.nodes[a][0] == self.nodes[a][1]:
+            return Wire(self, self.nodes[a][0])
+
+        key = (a, b)
+        if key not in self._gates:
+            self.nodes.append(key)
+            self.names.append(None)
+            self._gates[key] = len(self.nodes) - 1
+        return Wire(self, self._gates[key])
+
+    @property
+    def nand_count(self):
+        return sum(1 for idx in self.live() if self.nodes[idx] is not None)
+
+    def depth(self):
+        """
+        the most nands on a path from a source to an output or a next state bit
+        """
+        depth = {}
+        for idx in self.live():
+            gate_ = self.nodes[idx]
+            depth[idx] = 0 if gate_ is None else 1 + max(depth[gate_[0]], depth[gate_[1]])
+        return max(depth.values(), default=0)
+
+    def live(self):
+        """
+        node indices the outputs and the next state depend on, in topological order
+        """
+        alive = [False] * len(self.nodes)
+        stack = [w.node for w in leaves(self.outputs) if isinstance(w, Wire)]
+        stack += [w.node for _, w in self.state if isinstance(w, Wire)]
+        while stack:
+            idx = stack.pop()
+            if alive[idx]:
+                continue
+            alive[idx] = True
+            if self.nodes[idx] is not None:
+                stack.extend(self.nodes[idx])
+        return [idx for idx, a in enumerate(alive) if a]
+
+
+def leaves(value):
+    if isinstance(value, (list, tuple)):
+        for v in value:
+            yield from leaves(v)
+    else:
+        yield value
+
+
+def _is_signal(value):
+    if isinstance(value, list):
+        return len(value) > 0 and all(type(v) is int and v in (0, 1) for v in value)
+    return type(value) is int and value in (0, 1)
+
+
+def _symbolic(netlist, value, name):
+    if isinstance(value, gate.Word):
+        value = list(value)
+    if isinstance(value, list):
+        return [_symbolic(netlist, v, f'{name}[{idx}]') for idx, v in enumerate(value)]
+    if isinstance(value, tuple):
+        items = [_symbolic(netlist, v, f'{name}[{idx}]') for idx, v in enumerate(value)]
+        return type(value)(*items) if hasattr(value, '_fields') else tuple(items)
+    if value in (0, 1):
+        return netlist.source(name)
+    raise TypeError(f'not a signal: {name}={value!r}')
+
+
+def _record_origins(netlist, device, patch):
+    paths = {id(component): path for path, component in gate.walk(device)}
+    call = patch.original(gate.Nand)
+
+    def __call__(self, x, y):
+        res = call(self, x, y)
+        if isinstance(res, Wire):
+            netlist.origins.setdefault(res.node, paths.get(id(self)))
+        return res
+
+    patch.set(gate.Nand, __call__)
+
+
+def trace(device, *args, origins=False):
+    """
+    flattens the device into a Netlist, by calling a copy of it with symbolic inputs
+
+    args are example inputs, only their shape matters (ints and nested lists / tuples of ints).
+    Every 0/1 attribute of the components is replaced by a symbol too,
+    the ones the results depend on become the state of the netlist (latches, registers, counters).
+    With origins, netlist.origins maps the nands to the path of their Nand, e.g. 'ALU.adder.adders[3]...'
+    """
+    device = copy.deepcopy(device)
+    netlist = Netlist()
+    patch = hooks.Patch()
+    if origins:
+        _record_origins(netlist, device, patch)
+
+    candidates = []
+    for path, component in gate.walk(device):
+        for name, value in list(vars(component).items()):
+            if not _is_signal(value):
+                continue
+            wires = _symbolic(netlist, value, f'{path}.{name}')
+            setattr(component, name, wires)
+            candidates.append((component, name, wires, value))
+
+    netlist.inputs = [_symbolic(netlist, arg, f'arg{idx}') for idx, arg in enumerate(args)]
+    try:
+        netlist.outputs = device(*netlist.inputs)
+    finally:
+        patch.undo()
+
+    # source node -> (next value, value before the trace)
+    transitions = {}
+    for component, name, wires, value in candidates:
+        after = getattr(component, name)
+        if isinstance(wires, list):
+            if not isinstance(after, (list, tuple)) or len(after) != len(wires):
+                after = [None] * len(wires)
+            for w, a, v in zip(wires, after, value):
+                transitions[w.node] = (a, v)
+        else:
+            transitions[wires.node] = (after, value)
+
+    # keep the state bits the outputs depend on, then the ones those depend on, ...
+    used = set()
+    while True:
+        live_sources = {idx for idx in netlist.live() if netlist.nodes[idx] is None}
+        new = (live_sources & transitions.keys()) - used
+        if not new:
+            break
+        for node in sorted(new):
+            after, value = transitions[node]
+            if after is None:
+                raise TypeError(f'can not trace: {netlist.names[node]} has no next value')
+            netlist.state.append((node, after))
+            netlist.initial.append(value)
+        used |= new
+
+    return netlist
+
+
+def _target(value):
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_target(v) for v in value) + ']'
+    return f'n{value.node}'
+
+
+def _expression(value, namespace):
+    if isinstance(value, Wire):
+        return f'n{value.node}'
+    if isinstance(value, list):
+        return '[' + ', '.join(_expression(v, namespace) for v in value) + ']'
+    if isinstance(value, tuple):
+        items = ', '.join(_expression(v, namespace) for v in value)
+        if hasattr(value, '_fields'):
+            name = f'_{type(value).__name__}'
+            namespace[name] = type(value)
+            return f'{name}({items})'
+        return f'({items},)' if len(value) == 1 else f'({items})'
+    if value in (0, 1):
+        return str(value)
+    raise TypeError(f'not a signal: {value!r}')
+
+
+def codegen(netlist, name='step'):
+    """
+    emits the netlist as one straight line python function:
+        def step(arg0, arg1, ..., state): ... return result, next_state
+    """
+    params = [f'arg{idx}' for idx in range(len(netlist.inputs))] + ['state']
+    lines = [f'def {name}({", ".join(params)}):']
+
+    for idx, arg in enumerate(netlist.inputs):
+        lines.append(f'    {_target(arg)} = arg{idx}')
+    if netlist.state:
+        lines.append(f'    [{", ".join(f"n{node}" for node, _ in netlist.state)}] = state')
+
+    for idx in netlist.live():
+        gate_ = netlist.nodes[idx]
+        if gate_ is not None:
+            lines.append(f'    n{idx} = 1 - (n{gate_[0]} & n{gate_[1]})')
+
+    namespace = {}
+    result = _expression(netlist.outputs, namespace)
+    next_state = _expression(tuple(after for _, after in netlist.state), namespace)
+    lines.append(f'    return {result}, {next_state}')
+
+    source = '\n'.join(lines) + '\n'
+    exec(compile(source, f'<compiled {name}>', 'exec'), namespace)
+    function = namespace[name]
+    function.source = source
+    return function
+
+
+class CompiledDevice:
+    """
+    Drop-in replacement of a device, calling a single generated function instead of the component tree.
+
+        xor = CompiledDevice(gate.Xor(), 0, 0)
+        xor(1, 0)  --> 1
+    """
+    def __init__(self, device, *args):
+        self.netlist = trace(device, *args)
+        self.function = codegen(self.netlist, f'{type(device).__name__.lower()}_step')
+        self.state = tuple(self.netlist.initial)
+        self.res = None
+
+    def step(self):
+        pass
+
+    def reset(self):
+        """
+        back to the state of the device when it was traced
+        """
+        self.state = tuple(self.netlist.initial)
+        self.res = None
+
+    def __call__(self, *args):
+        self.res, self.state = self.function(*args, self.state)
+        return self.res
+
+    def read(self, name):
+        """
+        current value of a state bit, by its path e.g. 'CPU.D.latches[3].sr_latch.q'
+        """
+        for (node, _), value in zip(self.netlist.state, self.state):
+            if self.netlist.names[node] == name:
+                return value
+        raise KeyError(name)
+
+
+def _compiled_test():
+    import random
+    from nandcomp import alu
+    from nandcomp import ops
+    from nandcomp import utils
+    from nandcomp import computer
+
+    bits = lambda n: [random.randint(0, 1) for _ in range(n)]
+
+    xor = gate.Xor()
+    compiled = CompiledDevice(xor, 0, 0)
+    for x in (0, 1):
+        for y in (0, 1):
+            assert compiled(x, y) == xor(x, y)
+
+    adder = ops.FullAdd16Bit()
+    compiled = CompiledDevice(adder, [0]*16, [0]*16)
+    for _ in range(100):
+        xs, ys = bits(16), bits(16)
+        assert compiled(xs, ys) == adder(xs, ys)
+
+    alu_ = alu.ALU()
+    compiled = CompiledDevice(alu_, [0]*16, [0]*16, alu.AluFlag(*alu.zero_op))
+    for _ in range(200):
+        xs, ys, flags = bits(16), bits(16), alu.AluFlag(*bits(6))
+        assert compiled(xs, ys, flags) == alu_(xs, ys, flags)
+
+    cpu = computer.CPU()
+    compiled = CompiledDevice(cpu, [0]*16, [0]*16, 0)
+    for _ in range(200):
+        instruction, mem = bits(16), bits(16)
+        assert compiled(instruction, mem, 0) == cpu(instruction, mem, 0)
+    assert utils.to_integer(cpu.D.res) == utils.to_integer([compiled.read(f'CPU.D.res[{i}]') for i in range(16)])
+
+    print('alu nands', CompiledDevice(alu.ALU(), [0]*16, [0]*16, alu.AluFlag(*alu.zero_op)).netlist.nand_count)
+    print('cpu nands', compiled.netlist.nand_count)
+
+
+if __name__ == '__main__':
+    _compiled_test()
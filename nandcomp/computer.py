@@ -1,11 +1,21 @@
+from collections import namedtuple
+
 from nandcomp import alu
+from nandcomp import compiler
+from nandcomp import decoder
 from nandcomp import gate
+from nandcomp import latch
 from nandcomp import cu
+from nandcomp import event
 from nandcomp import memory
 from nandcomp import peripheral
+from nandcomp import snapshot
+from nandcomp import utils
 
 
 class CPU(gate.Device):
+    feedback = True
+
     def __init__(self):
         # inputs
         self.instruction = []
@@ -75,25 +85,175 @@ class CPU(gate.Device):
         return self.output_write_bit, self.output_M, self.address_M, self.output_PC
 
 
+# reason: 'breakpoint', 'write', 'value', 'halt' or 'cycles' (the budget ran out), address: of the watched write
+Stop = namedtuple('Stop', ['reason', 'cycles', 'pc', 'address'])
+
+
+class Until:
+    """
+    stop conditions of Computer.run, kept as sets so a cycle costs a lookup or two whatever their number
+    """
+    def __init__(self, breakpoints=(), writes=(), values=None, halt=True):
+        """
+        :param breakpoints: PCs to stop at, before their instruction runs
+        :param writes: RAM addresses to stop after any write into
+        :param values: {RAM address: unsigned word} to stop after that word is written there
+        :param halt: stop at the self loops ending a program (see halts)
+        """
+        self.breakpoints = frozenset(breakpoints)
+        self.writes = frozenset(writes)
+        self.values = dict(values or {})
+        self.halt = halt
+
+
+def halts(rom):
+    """
+    the PCs of the A-instructions entering a halt loop: @p or @p-1 at p-1, then an unconditional jump at p
+    (no destination). Once there the machine state never changes again.
+    """
+    found = set()
+    for p in range(1, len(rom)):
+        jump = decoder.decode(rom[p])
+        if jump.kind != 'C' or jump.jump != 0b111 or jump.dest:
+            continue
+        load = decoder.decode(rom[p - 1])
+        if load.kind == 'A' and load.value in (p, p - 1) and not load.dest & decoder.DEST_M:
+            found.add(p - 1)
+    return found
+
+
 class Computer(gate.Device):
-    def __init__(self, program):
+    feedback = True
+
+    def __init__(self, program, compiled=False, sparse=False, ram=None):
+        """
+        :param compiled: run the CPU as a single generated nand function (see compiler.py)
+        :param sparse: build the ROM and RAM registers on their first write (see memory.SparseCells)
+        :param ram: RAM compatible device to use instead of memory.RAM, e.g. memory.ArrayRAM
+        """
         self.reset = 0
-        self.PC_bus = [0] * 16
-        self.memory_bus = [0] * 16
+        self.PC_bus = gate.Word()
+        self.memory_bus = gate.Word()
+        self.write_address = None  # RAM address written by the last cycle
 
-        self.ROM = memory.ROM(program)
-        self.RAM = memory.RAM()
-        self.CPU = CPU()
+        self.ROM = memory.ROM(program, sparse)
+        self.RAM = memory.RAM(sparse) if ram is None else ram
+        self.CPU = compiler.CompiledDevice(CPU(), [0] * 16, [0] * 16, 0) if compiled else CPU()
 
         self.keyboard = peripheral.Keyboard(self.RAM)
         self.screen = peripheral.Screen(self.RAM)
+        self.devices = [self.keyboard, self.screen]
+
+    def attach(self, device):
+        """
+        adds a peripheral.MemoryMappedDevice of the RAM: updated before every RAM access, told the writes to its range
+        """
+        self.devices.append(device)
+        device.refresh()
+        return device
+
+    def reboot(self, program=None):
+        """
+        back to the power on state, without building the computer again:
+        the RAM is cleared, the CPU rebuilt (or reset, when compiled), and the program burnt if given
+        """
+        if program is not None:
+            self.ROM.burn(program)
+        self.RAM.clear()
+        if isinstance(self.CPU, compiler.CompiledDevice):
+            self.CPU.reset()
+        else:
+            self.CPU = CPU()
+
+        self.reset = 0
+        self.PC_bus = gate.Word()
+        self.memory_bus = gate.Word()
+        self.write_address = None
+        for device in self.devices:
+            device.refresh()
+        event.invalidate()
+
+    def _registers(self):
+        if isinstance(self.CPU, compiler.CompiledDevice):
+            def latched(name, idx):
+                try:
+                    return self.CPU.read(f'CPU.{name}.latches[{idx}].sr_latch.q')
+                except KeyError:
+                    return 1 - self.CPU.read(f'CPU.{name}.latches[{idx}].sr_latch.q_')
+
+            a = [latched('A', idx) for idx in range(16)]
+            d = [latched('D', idx) for idx in range(16)]
+            pc = [self.CPU.read(f'CPU.PC.res[{idx}]') for idx in range(16)]
+            return a, d, pc
+        return self.CPU.A.res, self.CPU.D.res, self.CPU.PC.res
+
+    def _latches(self):
+        return [device for _, device in gate.walk(self.CPU) if isinstance(device, latch.SrLatchNand)]
+
+    def snapshot(self):
+        """
+        the state of the machine: registers, buses, latches of the CPU, ROM and RAM (see snapshot.py)
+        """
+        word = lambda bits: utils.to_integer(bits) & 0xFFFF
+        a, d, pc = self._registers()
+        compiled = isinstance(self.CPU, compiler.CompiledDevice)
+        if compiled:
+            latches = bytes(self.CPU.state)
+        else:
+            latches = bytes(bit for sr in self._latches() for bit in (sr.q, sr.q_))
+        return snapshot.Snapshot(word(a), word(d), word(pc), word(self.PC_bus), word(self.memory_bus), self.reset,
+                                 compiled, latches, self.ROM.dump(), self.RAM.dump())
+
+    def restore(self, state):
+        """
+        back to a snapshot, writing only the registers, latches and memory words which differ
+        """
+        if isinstance(self.CPU, compiler.CompiledDevice):
+            if not state.compiled:
+                raise ValueError('the snapshot of a gate level CPU can not be restored into a compiled one')
+            self.CPU.state = tuple(state.latches)
+            self.CPU.res = None
+        else:
+            a, d, pc = self._registers()
+            if utils.to_integer(a) & 0xFFFF != state.A:
+                self.CPU.A(utils.to_machine_number(state.A), gate.HIGH)
+            if utils.to_integer(d) & 0xFFFF != state.D:
+                self.CPU.D(utils.to_machine_number(state.D), gate.HIGH)
+            if utils.to_integer(pc) & 0xFFFF != state.PC:
+                self.CPU.PC.res = utils.to_machine_number(state.PC)
+            if not state.compiled:
+                for idx, sr in enumerate(self._latches()):
+                    q, q_ = state.latches[2*idx], state.latches[2*idx + 1]
+                    if (sr.q, sr.q_) != (q, q_):
+                        sr.q, sr.q_ = q, q_
+
+        for memory_, words in ((self.ROM, state.rom), (self.RAM, state.ram)):
+            current = memory_.dump()
+            for idx, word in enumerate(words):
+                if current[idx] != word:
+                    memory_.poke(idx, word)
+
+        self.reset = state.reset
+        self.PC_bus = gate.Word(state.PC_bus)
+        self.memory_bus = gate.Word(state.memory_bus)
+        for device in self.devices:
+            device.refresh()
+        event.invalidate()
 
     def _wiring(self):
         instruction = self.ROM(self.PC_bus)
-        write_bit, data, address, pc = self.CPU(instruction, self.memory_bus, self.reset)
-        self.RAM(address, data, write_bit)
-        self.PC_bus = pc
-        self.memory_bus = self.RAM(address, data, 0)
+        write_bit, data, address, pc = self.CPU(instruction, self.memory_bus.bits, self.reset)
+        for device in self.devices:
+            device.update()
+        # a single access: the RAM reads back the addressed word after the write
+        self.memory_bus = gate.Word.from_bits(self.RAM(address, data, write_bit))
+        self.PC_bus = gate.Word.from_bits(pc)
+        self.write_address = None
+        if write_bit:
+            idx = self.write_address = utils.to_integer(address) & 0x7FFF
+            for device in self.devices:
+                if device.maps(idx):
+                    device.write(idx, utils.to_integer(data) & 0xFFFF)
 
     def step(self):
         self._wiring()
@@ -103,6 +263,55 @@ class Computer(gate.Device):
         next_instruction = self.ROM(self.PC_bus)
         return self.PC_bus, next_instruction
 
+    def run(self, max_cycles, until=None):
+        """
+        steps until a condition of until (an Until) is met, or for max_cycles, returns a Stop.
+        A breakpoint at the current PC does not stop the run, so a run can resume from it.
+        """
+        until = Until(halt=False) if until is None else until
+        pcs = until.breakpoints | (halts(self.ROM.dump()) if until.halt else set())
+        watched = until.writes | until.values.keys()
+        word = lambda bits: utils.to_integer(bits) & 0xFFFF
+
+        for cycle in range(1, max_cycles + 1):
+            self.step()
+            address = self.write_address
+            if address is not None and address in watched:
+                if address in until.writes:
+                    return Stop('write', cycle, word(self.PC_bus), address)
+                if word(self.memory_bus) == until.values[address]:
+                    return Stop('value', cycle, word(self.PC_bus), address)
+            if pcs:
+                pc = word(self.PC_bus)
+                if pc in pcs:
+                    return Stop('breakpoint' if pc in until.breakpoints else 'halt', cycle, pc, None)
+        return Stop('cycles', max_cycles, word(self.PC_bus), None)
+
+
+# sums 1..100 into RAM[17], then loops at 18
+SUM100 = [
+    0b0000000000010000,  # 0   @i        --> A = 16
+    0b1111111111001000,  # 1   M = 1     --> M[16] = 1    --> var i = 1
+    0b0000000000010001,  # 2   @sum      --> A = 17
+    0b1110101010001000,  # 3   M = 0     --> M[17] = 0    --> var sum = 0
+    0b0000000000010000,  # 4   @i        --> A = 16
+    0b1111110000010000,  # 5   D = M     --> D = M[16]    --> D = i
+    0b0000000001100100,  # 6   @100      --> A = 100
+    0b1110010011010000,  # 7   D = D - A --> D = D - 100  --> D = i - 100
+    0b0000000000010010,  # 8   @END      --> A = 18
+    0b1110001100000001,  # 9   D;JGT     --> IF D > 0 THEN GOTO 18
+    0b0000000000010000,  # 10  @i        --> A = 16
+    0b1111110000010000,  # 11  D = M     --> D = M[16]          --> D = i
+    0b0000000000010001,  # 12  @sum      --> A = 17
+    0b1111000010001000,  # 13  M = D + M --> M[17] = M[17] + D  --> sum += i
+    0b0000000000010000,  # 14  @i        --> A = 16
+    0b1111110111001000,  # 15  M = M + 1 --> M[16] = M[16] + 1  --> i++
+    0b0000000000000100,  # 16  @LOOP     --> A = 4
+    0b1110101010000111,  # 17  0;JMP     --> GOTO 4
+    0b0000000000010010,  # 18  @END      --> A = 18
+    0b1110101010000111,  # 19  0;JMP     --> GOTO 18
+]
+
 
 def program_test():
     from nandcomp import utils
@@ -121,30 +330,8 @@ def program_test():
         0b0000000000000000,  # @0        --> A = 0
         0b1110001100001000,  # M = D     --> M[0] = 3
     ]
-    sum100 = [
-        0b0000000000010000,  # 0   @i        --> A = 16
-        0b1111111111001000,  # 1   M = 1     --> M[16] = 1    --> var i = 1
-        0b0000000000010001,  # 2   @sum      --> A = 17
-        0b1110101010001000,  # 3   M = 0     --> M[17] = 0    --> var sum = 0
-        0b0000000000010000,  # 4   @i        --> A = 16
-        0b1111110000010000,  # 5   D = M     --> D = M[16]    --> D = i
-        0b0000000001100100,  # 6   @100      --> A = 100
-        0b1110010011010000,  # 7   D = D - A --> D = D - 100  --> D = i - 100
-        0b0000000000010010,  # 8   @END      --> A = 18
-        0b1110001100000001,  # 9   D;JGT     --> IF D > 0 THEN GOTO 18
-        0b0000000000010000,  # 10  @i        --> A = 16
-        0b1111110000010000,  # 11  D = M     --> D = M[16]          --> D = i
-        0b0000000000010001,  # 14  @sum      --> A = 17
-        0b1111000010001000,  # 13  M = D + M --> M[17] = M[17] + D  --> sum += i
-        0b0000000000010000,  # 14  @i        --> A = 16
-        0b1111110111001000,  # 15  M = M + 1 --> M[16] = M[16] + 1  --> i++
-        0b0000000000000100,  # 16  @LOOP     --> A = 4
-        0b1110101010000111,  # 17  0;JMP     --> GOTO 4
-        0b0000000000010010,  # 18  @END      --> A = 18
-        0b1110101010000111,  # 19  0;JMP     --> GOTO 18
-    ]
 
-    image = utils.create_image(sum100)
+    image = utils.create_image(SUM100)
     computer = Computer(image)
     next_address, next_ir = computer()
 
@@ -165,5 +352,28 @@ def program_test():
         print('-'*48)
 
 
+def _run_test():
+    image = utils.create_image(SUM100)
+    assert halts(SUM100) == {18}
+
+    machine = Computer(image, compiled=True, sparse=True)
+    stop = machine.run(5000, Until())
+    assert stop.reason == 'halt' and stop.pc == 18 and machine.RAM.peek(17) == 5050
+    assert machine.run(101, Until(halt=False)) == Stop('cycles', 101, 19, None)
+
+    machine.reboot()
+    first = machine.run(5000, Until(breakpoints=[13]))
+    second = machine.run(5000, Until(breakpoints=[13]))
+    assert first.reason == second.reason == 'breakpoint' and first.pc == 13 and second.cycles == 14
+    assert machine.RAM.peek(17) == 1
+
+    machine.reboot()
+    assert machine.run(5000, Until(writes=[17])) == Stop('write', 4, 4, 17)
+    stop = machine.run(5000, Until(values={16: 5}))
+    assert stop.reason == 'value' and stop.address == 16 and machine.RAM.peek(16) == 5
+    assert machine.run(5000).reason == 'cycles'
+
+
 if __name__ == '__main__':
+    _run_test()
     program_test()
@@ -4,13 +4,15 @@ from nandcomp import memory
 
 
 class SequenceGenerator(gate.Device):
+    feedback = True
+
     def __init__(self):
         self.register = memory.Register(2)
         self.inc = ops.Increment2bit()
         self.res = self.register.res
 
     def _wiring(self):
-        set_bit = 1
+        set_bit = gate.HIGH
         res = self.inc(self.register.res)
         self.register(res, set_bit)
         return res
@@ -25,14 +27,19 @@ class SequenceGenerator(gate.Device):
 
 
 class ProgramCounter(gate.Device):
-    def __init__(self):
+    feedback = True
+
+    def __init__(self, incrementer=ops.Increment16bit):
+        """
+        :param incrementer: 16 bit incrementer class, e.g. ops.HalfAddIncrement16bit (see ops.report)
+        """
         self.input = [0]*16
         self.inc_bit = 0
         self.write_bit = 0
         self.reset = 0
         self.res = [0]*16
 
-        self.increment = ops.Increment16bit()
+        self.increment = incrementer()
         self.mux0 = gate.Multiplexer2()
         self.mux1 = gate.Multiplexer2()
         self.mux2 = gate.Multiplexer2()
@@ -40,7 +47,7 @@ class ProgramCounter(gate.Device):
     def _wiring(self):
         res = self.mux0(self.res, self.input, self.write_bit)
         res = self.mux1(res, self.increment(res), self.inc_bit)
-        res = self.mux2(res, [0]*16, self.reset)
+        res = self.mux2(res, gate.ZERO, self.reset)
         return res
 
     def step(self):
@@ -0,0 +1,94 @@
+"""
+Decode table of the 2**16 instruction words, built on first use: decoding is a single index.
+
+    decoder.decode(0b1110001100000001)
+    --> Instruction(kind='C', value=None, am=0, alu=alu_flag(zx=0, nx=0, zy=1, ny=1, f=0, no=0),
+                    dest=0, jump=1, text='NULL = D & !0; 001')
+
+The fields are read the way CPU._decode reads them, for A-instructions too:
+the CPU runs the ALU and the M write (dest bit 3) whatever the kind.
+"""
+from collections import namedtuple
+
+from nandcomp import alu
+
+# kind: 'A' or 'C', value: the loaded constant of an A-instruction,
+# dest: the 3 bits A D M as an int, jump: the 3 bits j1 j2 j3 as an int
+Instruction = namedtuple('Instruction', ['kind', 'value', 'am', 'alu', 'dest', 'jump', 'text'])
+
+DEST_A = 0b100
+DEST_D = 0b010
+DEST_M = 0b001
+
+_table = None
+
+
+def _text(word, am, flag, dest, jump):
+    if not word >> 15:
+        return f'A = {word & 0x7FFF}'
+
+    ys = 'M[A]' if am else 'A'
+    destination = [name for bit, name in ((DEST_A, 'A'), (DEST_D, 'D'), (DEST_M, 'M[A]')) if dest & bit]
+    dest_str = ', '.join(destination) if destination else 'NULL'
+
+    xs = '0' if flag.zx else 'D'
+    xs_sign = '!' if flag.nx else ''
+    ys = '0' if flag.zy else ys
+    ys_sign = '!' if flag.ny else ''
+    op = '+' if flag.f else '&'
+    jump_str = f'{jump:03b}' if jump else ''
+
+    if flag.no:
+        return f'{dest_str} = !({xs_sign}{xs} {op} {ys_sign}{ys}); {jump_str}'
+    return f'{dest_str} = {xs_sign}{xs} {op} {ys_sign}{ys}; {jump_str}'
+
+
+def _decode(word, flags):
+    am = (word >> 12) & 1
+    flag = flags[(word >> 6) & 0b111111]
+    dest = (word >> 3) & 0b111
+    jump = word & 0b111
+    kind, value = ('C', None) if word >> 15 else ('A', word & 0x7FFF)
+    return Instruction(kind, value, am, flag, dest, jump, _text(word, am, flag, dest, jump))
+
+
+def table():
+    """
+    the Instruction of every word, indexed by the unsigned word
+    """
+    global _table
+    if _table is None:
+        # the 64 flag tuples are shared by the whole table
+        flags = [alu.AluFlag(*((bits >> shift) & 1 for shift in range(5, -1, -1))) for bits in range(64)]
+        _table = [_decode(word, flags) for word in range(2**16)]
+    return _table
+
+
+def decode(word):
+    """
+    unsigned 16 bit int --> Instruction
+    """
+    return table()[word & 0xFFFF]
+
+
+def _decoder_test():
+    from nandcomp import utils
+
+    # against the bit slices of CPU._decode
+    for word in range(0, 2**16, 7):
+        instruction = decode(word)
+        bits = utils.to_machine_number(word)
+        as_int = lambda bits_: int(''.join(map(str, bits_)), 2)
+        assert (instruction.kind == 'C') == bits[0]
+        assert instruction.am == bits[3] and instruction.alu == tuple(bits[4:10])
+        assert instruction.dest == as_int(bits[10:13]) and instruction.jump == as_int(bits[13:16])
+
+    assert decode(0b0000000001100100).text == 'A = 100'
+    assert decode(0b1111000010001000).text == 'M[A] = D + M[A]; '
+    assert decode(0b1110101010000111).text == 'NULL = 0 + 0; 111'
+    assert decode(0b1110001100000001).alu == alu.AluFlag(*alu.x_op)
+    assert decode(0xFFFF) is decode(-1)
+
+
+if __name__ == '__main__':
+    _decoder_test()
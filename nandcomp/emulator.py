@@ -0,0 +1,199 @@
+"""
+ISA level emulator: runs the machine code of computer.Computer directly on python ints.
+
+It decodes the instructions exactly like CPU._decode and follows the CPU wiring, quirks included:
+the ALU runs on A-instructions too (the address bits act as ALU flags),
+the M write bit (dest bit 3) is not gated by the a/c bit,
+and M is the value the RAM put on the memory bus at the end of the previous cycle.
+"""
+from nandcomp import decoder
+from nandcomp import utils
+
+WORD = 0xFFFF
+RAM_SIZE = 2**15
+
+
+def to_word(instruction):
+    """
+    bus (list of bits) or int --> unsigned 16 bit int
+    """
+    if isinstance(instruction, int):
+        return instruction & WORD
+    return utils.to_integer(instruction) & WORD
+
+
+def decode(word):
+    """
+    (ac, am, zx, nx, zy, ny, f, no, write_d, write_m, j1, j2, j3) bits of an instruction word
+    """
+    instruction = decoder.decode(word)
+    ac = int(instruction.kind == 'C')
+    write_d = ac & (instruction.dest & decoder.DEST_D) >> 1
+    write_m = instruction.dest & decoder.DEST_M
+    jump = instruction.jump
+    return (ac, instruction.am, *instruction.alu, write_d, write_m, jump >> 2, (jump >> 1) & 1, jump & 1)
+
+
+def compute(x, y, zx, nx, zy, ny, f, no):
+    """
+    alu.ALU on unsigned 16 bit ints, returns (result, is_zero, is_negative)
+    """
+    if zx:
+        x = 0
+    if nx:
+        x ^= WORD
+    if zy:
+        y = 0
+    if ny:
+        y ^= WORD
+    res = ((x + y) & WORD) if f else (x & y)
+    if no:
+        res ^= WORD
+    return res, int(res == 0), res >> 15
+
+
+class Emulator:
+    def __init__(self, program):
+        if len(program) > RAM_SIZE:
+            raise ValueError
+
+        self.ROM = [0] * RAM_SIZE
+        for idx, instruction in enumerate(program):
+            self.ROM[idx] = to_word(instruction)
+        self.RAM = [0] * RAM_SIZE
+
+        self.reset = 0
+        self.A = 0
+        self.D = 0
+        self.PC = 0
+        self.memory_bus = 0
+
+        self.write_address = None  # RAM cell written by the last cycle
+        self.cycles = 0
+
+        self._decoded = {}
+
+    def _decode(self, word):
+        decoded = self._decoded.get(word)
+        if decoded is None:
+            decoded = self._decoded[word] = decode(word)
+        return decoded
+
+    def step(self):
+        word = self.ROM[self.PC % RAM_SIZE]
+        ac, am, zx, nx, zy, ny, f, no, write_d, write_m, j1, j2, j3 = self._decode(word)
+
+        if not ac:
+            self.A = word
+        res, is_zero, is_negative = compute(self.D, self.memory_bus if am else self.A, zx, nx, zy, ny, f, no)
+        if write_d:
+            self.D = res
+
+        is_positive = not (is_zero or is_negative)
+        jump = ac and ((j1 and is_negative) or (j2 and is_zero) or (j3 and is_positive))
+        self.PC = 0 if self.reset else (self.A if jump else (self.PC + 1) & WORD)
+
+        address = self.A % RAM_SIZE
+        if write_m:
+            self.RAM[address] = res
+            self.write_address = address
+        else:
+            self.write_address = None
+        self.memory_bus = self.RAM[address]
+        self.cycles += 1
+
+    def run(self, cycles):
+        """
+        the same as calling step() cycles times, with the registers kept in locals
+        """
+        rom, ram, decoded = self.ROM, self.RAM, self._decode
+        a, d, pc, bus = self.A, self.D, self.PC, self.memory_bus
+        write_address = self.write_address
+
+        for _ in range(cycles):
+            word = rom[pc % RAM_SIZE]
+            ac, am, zx, nx, zy, ny, f, no, write_d, write_m, j1, j2, j3 = decoded(word)
+
+            if not ac:
+                a = word
+            x = 0 if zx else d
+            y = 0 if zy else (bus if am else a)
+            if nx:
+                x ^= WORD
+            if ny:
+                y ^= WORD
+            res = ((x + y) & WORD) if f else (x & y)
+            if no:
+                res ^= WORD
+            if write_d:
+                d = res
+
+            if ac and ((j1 and res >> 15) or (j2 and not res) or (j3 and res and not res >> 15)):
+                pc = a
+            else:
+                pc = (pc + 1) & WORD
+            if self.reset:
+                pc = 0
+
+            address = a % RAM_SIZE
+            if write_m:
+                ram[address] = res
+                write_address = address
+            else:
+                write_address = None
+            bus = ram[address]
+
+        self.A, self.D, self.PC, self.memory_bus = a, d, pc, bus
+        self.write_address = write_address
+        self.cycles += cycles
+
+    def __call__(self):
+        self.step()
+        return self.PC, self.ROM[self.PC % RAM_SIZE]
+
+
+class Mismatch(Exception):
+    pass
+
+
+def lockstep(computer, emulator, cycles):
+    """
+    steps the gate level computer and the emulator side by side,
+    comparing A, D, PC and the RAM cell on the memory bus (the written one, if any) after every cycle
+    """
+    for cycle in range(cycles):
+        computer.step()
+        emulator.step()
+
+        state = {
+            'A': (to_word(computer.CPU.A.res), emulator.A),
+            'D': (to_word(computer.CPU.D.res), emulator.D),
+            'PC': (to_word(computer.PC_bus), emulator.PC),
+            f'RAM[{emulator.A % RAM_SIZE}]': (to_word(computer.memory_bus), emulator.memory_bus),
+        }
+        for name, (gate_level, isa_level) in state.items():
+            if gate_level != isa_level:
+                raise Mismatch(f'cycle {cycle}: {name} is {gate_level} on the computer, {isa_level} emulated')
+
+
+def _lockstep_test():
+    import random
+    from nandcomp import computer
+
+    image = utils.create_image(computer.SUM100)
+    lockstep(computer.Computer(image, sparse=True), Emulator(image), 1000)
+
+    emulator = Emulator(image)
+    emulator.run(2000)
+    assert emulator.RAM[17] == 5050
+
+    # random programs, jumps included, mostly within the first few words of RAM and ROM
+    random.seed(0)
+    program = [random.randint(0, 2**16 - 1) if random.random() < 0.7
+               else random.randint(0, 31) for _ in range(32)]
+    image = utils.create_image(program)
+    lockstep(computer.Computer(image, sparse=True), Emulator(image), 500)
+
+
+if __name__ == '__main__':
+    _lockstep_test()
@@ -0,0 +1,166 @@
+"""
+Event-driven mode: a device is only evaluated when its inputs changed since its last call.
+
+Every device remembers its last inputs and result; a call with the same inputs returns the result
+without running the wiring, so only the fan-out of the wires that changed is evaluated again.
+
+    with event.events():
+        for _ in range(1000):
+            computer.step()
+    print(event.counter.fraction)  # nands evaluated / nands of the full evaluation
+
+This holds for the combinational devices and for the latches and registers, which end up in the
+same state when called twice with the same inputs. The devices which do not (their result feeds
+back into their own inputs, like a counter) are marked with `feedback = True` and always evaluated.
+State changed behind the wiring (RAM cells poked from outside, ...) needs an invalidate().
+
+Like wide mode this is a global mode: it patches __call__ on the gate.Device classes defined so far.
+"""
+import contextlib
+
+from nandcomp import gate
+from nandcomp import hooks
+
+
+class Counter:
+    """
+    nand evaluations: the ones run, and the ones a full evaluation would have run on top of them
+    """
+    def __init__(self):
+        self.evaluated = 0
+        self.skipped = 0
+
+    def reset(self):
+        self.evaluated = 0
+        self.skipped = 0
+
+    @property
+    def fraction(self):
+        total = self.evaluated + self.skipped
+        return self.evaluated / total if total else 1.0
+
+
+counter = Counter()
+
+_patch = hooks.Patch()
+_generation = 0
+
+
+def invalidate():
+    """
+    drops the last inputs of every device, the next calls are fully evaluated
+    """
+    global _generation
+    _generation += 1
+
+
+def _freeze(value):
+    return tuple(value) if type(value) is list else value
+
+
+def _counted(call):
+    def __call__(self, x, y):
+        counter.evaluated += 1
+        return call(self, x, y)
+    return __call__
+
+
+def _cached(call):
+    def __call__(self, *args, **kwargs):
+        key = tuple(map(_freeze, args))
+        if kwargs:
+            key += tuple((name, _freeze(value)) for name, value in kwargs.items())
+
+        last = self.__dict__.get('_last_call')
+        if last is not None and last[0] == key and last[3] == _generation:
+            counter.skipped += last[2]
+            return last[1]
+
+        before = counter.evaluated + counter.skipped
+        res = call(self, *args, **kwargs)
+        self._last_call = (key, res, counter.evaluated + counter.skipped - before, _generation)
+        return res
+    return __call__
+
+
+def enabled():
+    return bool(_patch)
+
+
+def enable(gates=False):
+    """
+    :param gates: cache the simple gates (Not, And, Or, ...) too: fewer nand evaluations,
+                  but their bookkeeping costs more time than the few nands it saves
+    """
+    if enabled():
+        return
+    invalidate()
+    simple = (gate.SimpleGate1, gate.SimpleGate2, gate.SimpleGate3)
+
+    # parents come first, a class inheriting __call__ gets the patched one unless patched itself
+    for cls in hooks.device_classes():
+        own = cls.__dict__.get('__call__')
+        if cls is gate.Nand:
+            _patch.set(cls, _counted(_patch.original(cls)))
+        elif cls.feedback:
+            if own is None:
+                _patch.set(cls, _patch.original(cls))
+        elif own is not None and (gates or cls not in simple):
+            _patch.set(cls, _cached(own))
+
+
+def disable():
+    _patch.undo()
+
+
+@contextlib.contextmanager
+def events(gates=False):
+    was_enabled = enabled()
+    enable(gates)
+    try:
+        yield counter
+    finally:
+        if not was_enabled:
+            disable()
+
+
+def _event_test():
+    from nandcomp import computer
+    from nandcomp import emulator
+    from nandcomp import utils
+
+    image = utils.create_image(computer.SUM100)
+
+    for gates in (False, True):
+        counter.reset()
+        with events(gates):
+            emulator.lockstep(computer.Computer(image, sparse=True), emulator.Emulator(image), 500)
+        assert not enabled()
+        print(f'nands evaluated: {counter.fraction:.1%}, gates cached: {gates}')
+
+    # a key pressed between two identical RAM accesses: the second one reads the poked word
+    from nandcomp import memory
+    from nandcomp import peripheral
+    read_key = utils.create_image([
+        peripheral.KBD,      # @KBD
+        peripheral.KBD,      # @KBD
+        0b1111110000010000,  # D = M
+        0b0000000000010000,  # @16
+        0b1110001100001000,  # M = D
+    ])
+    for ram in (None, memory.RAM32K(), memory.ArrayRAM()):
+        machine = computer.Computer(read_key, sparse=True, ram=ram)
+        with events():
+            machine.step()
+            machine.keyboard.press('a')
+            for _ in range(4):
+                machine.step()
+        assert machine.RAM.peek(16) == ord('a'), type(machine.RAM).__name__
+
+    xor = gate.Xor()
+    with events(gates=True):
+        assert [xor(x, y) for x, y in ((0, 1), (0, 1), (1, 1), (1, 1))] == [1, 1, 0, 0]
+
+
+if __name__ == '__main__':
+    _event_test()
@@ -1,12 +1,105 @@
 import abc
 
+# a wire carrying 1: the int 1, or one 1 bit per simulated machine in wide mode (see wide.py)
+HIGH = 1
+
 
 class Device:
+    # the result feeds back into the inputs, calls with the same inputs differ (see event.py)
+    feedback = False
+
     @abc.abstractmethod
     def step(self):
         pass
 
 
+# the bits of every byte, msb first
+_BYTE_BITS = [tuple((byte >> shift) & 1 for shift in range(7, -1, -1)) for byte in range(256)]
+# bytes of 0 / 1 bits --> the ascii digits int() reads
+_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+class Word:
+    """
+    A 16 bit bus which is also an unsigned int: the buses between the CPU and the memories (Computer.PC_bus,
+    Computer.memory_bus) are read as a number by the memories and utils.to_integer, without a loop over the bits.
+    It holds the int or the bits it was made from, the other one is built on first use;
+    read as a bus word[0] is the msb. A Word only equals a Word of the same value.
+    """
+    __slots__ = ('_value', '_bits')
+
+    def __init__(self, value=0):
+        """
+        :param value: unsigned 16 bit int
+        """
+        self._value = value
+        self._bits = None
+
+    @classmethod
+    def from_bits(cls, bits):
+        """
+        bus (msb first, not written into afterwards) --> Word, a Word is returned as is
+        """
+        if type(bits) is cls:
+            return bits
+        word = cls(None)
+        word._bits = bits
+        return word
+
+    @property
+    def value(self):
+        if self._value is None:
+            self._value = int(bytes(self._bits).translate(_DIGITS), 2)
+        return self._value
+
+    @property
+    def bits(self):
+        if self._bits is None:
+            self._bits = _BYTE_BITS[self._value >> 8] + _BYTE_BITS[self._value & 0xFF]
+        return self._bits
+
+    def __getitem__(self, idx):
+        return self.bits[idx]
+
+    def __len__(self):
+        return 16
+
+    def __iter__(self):
+        return iter(self.bits)
+
+    def __eq__(self, other):
+        if type(other) is Word:
+            return self.value == other.value
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return f'Word({self.value:#06x})'
+
+
+# the constant bus of 16 zeros (the same in wide mode), shared since nothing writes into a bus
+ZERO = (0,) * 16
+
+
+def walk(device, path=None):
+    """
+    yields (path, device) for the device and every component wired into it,
+    e.g. ('CPU.ALU.adder.adders[7]', <FullAdd>)
+    """
+    path = type(device).__name__ if path is None else path
+    yield path, device
+
+    for name, value in vars(device).items():
+        if isinstance(value, Device):
+            yield from walk(value, f'{path}.{name}')
+        elif isinstance(value, list):
+            for idx, item in enumerate(value):
+                if isinstance(item, Device):
+                    yield from walk(item, f'{path}.{name}[{idx}]')
+
+
 class SimpleGate1(Device):
     def __init__(self, x=None, res=None):
         self.x = x
@@ -73,7 +166,7 @@ class SimpleGate3(Device):
 class Nand(SimpleGate2):
     def _wiring(self):
         temp = self.x & self.y
-        res = 1 - temp
+        res = HIGH - temp
         return res
 
 
@@ -165,9 +258,9 @@ class BitwiseOp1(SimpleGate1):
         self.ops = [op_gate() for _ in range(self.width)]
 
     def _wiring(self):
-        res = []
+        res = [0] * self.width
         for idx in range(self.width):
-            res.append(self.ops[idx](self.x[idx]))
+            res[idx] = self.ops[idx](self.x[idx])
         return res
 
 
@@ -181,9 +274,9 @@ class BitwiseOp2(SimpleGate2):
         if len(self.x) != len(self.y) or len(self.x) != self.width:
             raise ValueError('invalid length')
 
-        res = []
+        res = [0] * self.width
         for idx in range(self.width):
-            res.append(self.ops[idx](self.x[idx], self.y[idx]))
+            res[idx] = self.ops[idx](self.x[idx], self.y[idx])
         return res
 
 
@@ -227,10 +320,10 @@ class Multiplexer2(Device):
         self.multiplexers = [OneBitMultiplexer() for _ in range(self.width)]
 
     def _wiring(self):
-        res = []
+        res = [0] * self.width
         for idx in range(self.width):
             b = self.multiplexers[idx](self.xs[idx], self.ys[idx], self.selector)
-            res.append(b)
+            res[idx] = b
         return res
 
     def step(self):
@@ -261,12 +354,12 @@ class Multiplexer4(Device):
         self.mux2 = Multiplexer2(width)
 
     def _wiring(self):
-        res = []
+        res = [0] * self.width
         for idx in range(self.width):
             a = self.mux0(self.xs[idx], self.ys[idx], self.selector0)
             b = self.mux1(self.zs[idx], self.ws[idx], self.selector0)
             temp = self.mux2(a, b, self.selector1)
-            res.append(temp)
+            res[idx] = temp
         return res
 
     def step(self):
@@ -285,6 +378,114 @@ class Multiplexer4(Device):
         return self.res
 
 
+class OneBitDemultiplexer(Device):
+    """
+    x, selector --> (x, 0) when selector is 0, (0, x) when it is 1
+    """
+    def __init__(self):
+        self.x = 0
+        self.selector = 0
+        self.res = (0, 0)
+
+        self.and0 = And()
+        self.and1 = And()
+        self.not_ = Not()
+
+    def _wiring(self):
+        a = self.and0(self.x, self.not_(self.selector))
+        b = self.and1(self.x, self.selector)
+        return a, b
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, x, selector):
+        self.x = x
+        self.selector = selector
+        self.step()
+        return self.res
+
+
+class DemultiplexerTree(Device):
+    """
+    x to one of 2**n outputs, the others are 0: n levels of OneBitDemultiplexer, selector bits msb first
+    """
+    def __init__(self, n):
+        self.x = 0
+        self.selector = [0] * n
+        self.res = [0] * 2**n
+
+        self.demultiplexers = [OneBitDemultiplexer() for _ in range(2**n - 1)]
+
+    def _wiring(self):
+        outputs = [self.x]
+        idx = 0
+        for bit in self.selector:
+            split = []
+            for x in outputs:
+                split.extend(self.demultiplexers[idx](x, bit))
+                idx += 1
+            outputs = split
+        return outputs
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, x, selector):
+        self.x = x
+        self.selector = selector
+        self.step()
+        return self.res
+
+
+class MultiplexerTree(Device):
+    """
+    one of 2**n buses: n levels of Multiplexer2, selector bits msb first (the first level uses the last bit).
+
+    Only the multiplexers on the path of the selected input are evaluated, one per level. The others can not
+    change the output, they keep their last result, which the path multiplexer gets as its other input.
+    """
+    def __init__(self, n, width=16):
+        self.inputs = []
+        self.selector = [0] * n
+        self.res = [0] * width
+
+        # the levels one after the other, from the one reading the inputs
+        self.multiplexers = [Multiplexer2(width) for _ in range(2**n - 1)]
+
+    def _wiring(self):
+        selected = 0
+        for bit in self.selector:
+            selected = selected * 2 + (1 if bit else 0)
+
+        res = None
+        offset = 0
+        size = len(self.inputs)
+        for level, bit in enumerate(reversed(self.selector)):
+            idx = selected >> level
+            if level == 0:
+                xs, ys = self.inputs[idx & ~1], self.inputs[idx | 1]
+            else:
+                other = self.multiplexers[offset - size + (idx ^ 1)].res or res
+                xs, ys = (other, res) if idx & 1 else (res, other)
+            size //= 2
+            res = self.multiplexers[offset + (idx >> 1)](xs, ys, bit)
+            offset += size
+        return res
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, inputs, selector):
+        self.inputs = inputs
+        self.selector = selector
+        self.step()
+        return self.res
+
+
 class FeedingLoop(Device):
     def __init__(self):
         self.x = 0
@@ -0,0 +1,45 @@
+"""
+Patching __call__ on the gate.Device classes, the way the global modes (event.py, cache.py) hook into the devices.
+Patches stack: undo them in the reverse order.
+"""
+from nandcomp import gate
+
+
+def device_classes(cls=gate.Device):
+    """
+    the subclasses of cls defined so far, parents first
+    """
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from device_classes(subclass)
+
+
+class Patch:
+    def __init__(self):
+        self.originals = {}  # class -> its own __call__ (None when inherited) before the patch
+
+    def __bool__(self):
+        return bool(self.originals)
+
+    def original(self, cls):
+        """
+        the __call__ cls had before this patch
+        """
+        for base in cls.__mro__:
+            if self.originals.get(base) is not None:
+                return self.originals[base]
+            if base not in self.originals and '__call__' in base.__dict__:
+                return base.__dict__['__call__']
+
+    def set(self, cls, call):
+        if cls not in self.originals:
+            self.originals[cls] = cls.__dict__.get('__call__')
+        cls.__call__ = call
+
+    def undo(self):
+        for cls, own in self.originals.items():
+            if own is None:
+                del cls.__call__
+            else:
+                cls.__call__ = own
+        self.originals.clear()
@@ -0,0 +1,189 @@
+"""
+Basic block translator on top of the emulator.
+
+The ROM is split into basic blocks: a block ends after a jump instruction, or before a jump target
+(the @LABEL loaded right before a jump). Every block is compiled into one python function,
+    def block(a, d, ram): ... return a, d, next_pc
+and cached by its start PC, so loops run as straight python code instead of being decoded again.
+
+Note: at every cycle boundary the memory bus holds RAM[A], so the blocks read M from the RAM directly.
+"""
+from collections import namedtuple
+
+from nandcomp import emulator
+from nandcomp.emulator import WORD, RAM_SIZE
+
+MAX_BLOCK = 64
+
+Block = namedtuple('block', ['function', 'length', 'writes_last'])
+
+
+class ROM(list):
+    """
+    The emulator ROM, counting the writes into it, so stale translations can be dropped.
+    """
+    version = 0
+
+    def __setitem__(self, idx, value):
+        super().__setitem__(idx, value)
+        self.version += 1
+
+
+def _alu_expression(x, y, zx, nx, zy, ny, f, no):
+    if zx:
+        x = str(WORD) if nx else '0'
+    elif nx:
+        x = f'({x} ^ {WORD})'
+    if zy:
+        y = str(WORD) if ny else '0'
+    elif ny:
+        y = f'({y} ^ {WORD})'
+    res = f'(({x} + {y}) & {WORD})' if f else f'({x} & {y})'
+    if no:
+        res = f'({res} ^ {WORD})'
+    return res
+
+
+def _jump_condition(j1, j2, j3):
+    if j1 and j2 and j3:
+        return 'True'
+    conditions = []
+    if j1:
+        conditions.append(f'res > {WORD >> 1}')
+    if j2:
+        conditions.append('res == 0')
+    if j3:
+        conditions.append(f'0 < res <= {WORD >> 1}')
+    return ' or '.join(conditions)
+
+
+def jump_targets(rom):
+    """
+    addresses loaded into A right before a jump instruction
+    """
+    targets = set()
+    for idx in range(1, len(rom)):
+        word = rom[idx]
+        if word >> 15 and word & 0b111 and not rom[idx - 1] >> 15:
+            targets.add(rom[idx - 1])
+    return targets
+
+
+def translate(rom, pc, targets):
+    """
+    compiles the block starting at pc, returns a Block
+    """
+    lines = [f'def block_{pc}(a, d, ram):']
+    start = pc
+    length = 0
+    writes = False
+    next_pc = None
+
+    while next_pc is None:
+        word = rom[pc % RAM_SIZE]
+        ac, am, zx, nx, zy, ny, f, no, write_d, write_m, j1, j2, j3 = emulator.decode(word)
+        lines.append(f'    # {pc}: {word:016b}')
+        length += 1
+        writes = bool(write_m)
+
+        if not ac:
+            if write_m:
+                # M is still the cell of the previous A, y is either that or the new A
+                y = f'ram[a % {RAM_SIZE}]' if am else str(word)
+                lines.append(f'    ram[{word % RAM_SIZE}] = {_alu_expression("d", y, zx, nx, zy, ny, f, no)}')
+            lines.append(f'    a = {word}')
+        else:
+            y = f'ram[a % {RAM_SIZE}]' if am else 'a'
+            lines.append(f'    res = {_alu_expression("d", y, zx, nx, zy, ny, f, no)}')
+            if write_d:
+                lines.append('    d = res')
+            if write_m:
+                lines.append(f'    ram[a % {RAM_SIZE}] = res')
+            if j1 or j2 or j3:
+                next_pc = f'a if {_jump_condition(j1, j2, j3)} else {(pc + 1) & WORD}'
+
+        pc = (pc + 1) & WORD
+        if next_pc is None and (pc in targets or length == MAX_BLOCK):
+            next_pc = str(pc)
+
+    lines.append(f'    return a, d, {next_pc}')
+    source = '\n'.join(lines) + '\n'
+
+    namespace = {}
+    exec(compile(source, f'<block {start}>', 'exec'), namespace)
+    function = namespace[f'block_{start}']
+    function.source = source
+    return Block(function, length, writes)
+
+
+class JIT(emulator.Emulator):
+    def __init__(self, program):
+        super().__init__(program)
+        self.ROM = ROM(self.ROM)
+        self.blocks = {}
+        self._targets = set()
+        self._version = None
+
+    def _check_rom(self):
+        if self.ROM.version != self._version:
+            self.blocks.clear()
+            self._targets = jump_targets(self.ROM)
+            self._version = self.ROM.version
+
+    def run(self, cycles):
+        if self.reset:
+            return super().run(cycles)
+
+        self._check_rom()
+        ram, blocks = self.RAM, self.blocks
+        a, d, pc = self.A, self.D, self.PC
+        remaining = cycles
+        block = None
+
+        while remaining:
+            block = blocks.get(pc)
+            if block is None:
+                block = blocks[pc] = translate(self.ROM, pc, self._targets)
+            if block.length > remaining:
+                break
+            a, d, pc = block.function(a, d, ram)
+            remaining -= block.length
+
+        self.A, self.D, self.PC = a, d, pc
+        self.memory_bus = ram[a % RAM_SIZE]
+        self.write_address = a % RAM_SIZE if block is not None and block.writes_last else None
+        self.cycles += cycles - remaining
+
+        # the rest does not fill a whole block
+        if remaining:
+            super().run(remaining)
+
+
+def _jit_test():
+    import random
+    from nandcomp import computer
+
+    jit = JIT(computer.SUM100)
+    jit.run(2000)
+    assert jit.RAM[17] == 5050
+
+    # @18; 0;JMP --> @17; D=M; 0;JMP (the result copied into D)
+    jit.ROM[18:20] = [0b0000000000010001, 0b1111110000010000]
+    jit.ROM[20:22] = [0b0000000000010100, 0b1110101010000111]
+    jit.run(10)
+    assert jit.D == 5050
+
+    random.seed(1)
+    for _ in range(20):
+        program = [random.randint(0, 2**16 - 1) if random.random() < 0.7
+                   else random.randint(0, 31) for _ in range(32)]
+        reference, jit = emulator.Emulator(program), JIT(program)
+        for cycles in (1, 7, 100, 1000):
+            reference.run(cycles)
+            jit.run(cycles)
+            assert (jit.A, jit.D, jit.PC, jit.memory_bus, jit.RAM) == \
+                   (reference.A, reference.D, reference.PC, reference.memory_bus, reference.RAM)
+
+
+if __name__ == '__main__':
+    _jit_test()
@@ -13,7 +13,7 @@ class SrLatchNor(gate.Device):
     def __init__(self):
         self.s = None
         self.r = None
-        self.q = 1
+        self.q = gate.HIGH
         self.q_ = 0
 
         self.nor0 = gate.Nor()
@@ -25,8 +25,9 @@ class SrLatchNor(gate.Device):
         return qt, qt_
 
     def _stabilise(self):
-        for _ in range(2):
-            self.q, self.q_ = self._wiring()
+        # two rounds, unrolled
+        self.q, self.q_ = self._wiring()
+        self.q, self.q_ = self._wiring()
 
     def step(self):
         self._stabilise()
@@ -54,7 +55,7 @@ class SrLatchNand(gate.Device):
     def __init__(self):
         self.s = None
         self.r = None
-        self.q = 1
+        self.q = gate.HIGH
         self.q_ = 0
 
         self.nand0 = gate.Nand()
@@ -66,8 +67,9 @@ class SrLatchNand(gate.Device):
         return qt, qt_
 
     def _stabilise(self):
-        for _ in range(2):
-            self.q, self.q_ = self._wiring()
+        # two rounds, unrolled
+        self.q, self.q_ = self._wiring()
+        self.q, self.q_ = self._wiring()
 
     def step(self):
         self._stabilise()
@@ -1,5 +1,10 @@
+import array
+import mmap
+import os
+
 from nandcomp import gate
 from nandcomp import board
+from nandcomp import event
 from nandcomp import latch
 from nandcomp import utils
 
@@ -7,7 +12,7 @@ from nandcomp import utils
 class GatedLatch(gate.Device):
     def __init__(self):
         self.bit = 0
-        self.set_bit = 1
+        self.set_bit = gate.HIGH
         self.res = 0
 
         self.nand0 = gate.Nand()
@@ -36,13 +41,16 @@ class Register(gate.Device):
     def __init__(self, width):
         self.width = width
         self.bits = [0]*width
-        self.set_bits = 1
+        self.set_bits = gate.HIGH
         self.res = [0]*width
 
         self.latches = [GatedLatch() for _ in range(self.width)]
 
     def _wiring(self):
-        return [self.latches[idx](self.bits[idx], self.set_bits) for idx in range(self.width)]
+        res = [0] * self.width
+        for idx in range(self.width):
+            res[idx] = self.latches[idx](self.bits[idx], self.set_bits)
+        return res
 
     def step(self):
         res = self._wiring()
@@ -57,6 +65,16 @@ class Register(gate.Device):
     def __getitem__(self, idx):
         return self.latches[idx].res
 
+    def load(self, bits):
+        """
+        stores bits straight into the latches, the state a write of bits leaves, without running the gates
+        """
+        for gated, bit in zip(self.latches, bits):
+            q = gate.HIGH if bit else 0
+            gated.sr_latch.q, gated.sr_latch.q_ = q, gate.HIGH ^ q
+            gated.res = q
+        self.res = [latch_.res for latch_ in self.latches]
+
 
 class EightBit(Register):
     def __init__(self):
@@ -72,32 +90,132 @@ class SixteenBit(Register):
         return str(self.res)
 
 
+class SparseCells:
+    """
+    The registers of a sparse Memory: a register is only built when its address is first written,
+    untouched addresses read as a shared register which is never written (all zeros).
+    """
+    def __init__(self, size):
+        self.size = size
+        self.cells = {}
+        self.zero = SixteenBit()
+
+    def _index(self, idx):
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError('memory address out of range')
+        return idx
+
+    def materialize(self, idx):
+        idx = self._index(idx)
+        cell = self.cells.get(idx)
+        if cell is None:
+            cell = self.cells[idx] = SixteenBit()
+        return cell
+
+    def __getitem__(self, idx):
+        return self.cells.get(self._index(idx), self.zero)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for idx in range(self.size):
+            yield self[idx]
+
+
 class Memory(gate.Device):
-    def __init__(self, address_space=15):
-        self.memory = [SixteenBit() for _ in range(2**address_space)]
+    """
+    Write-then-read port: the output is the addressed word after the (optional) write,
+    so a write and the read-back of the same cell take a single access.
+    """
+    # poke writes the cells behind the calls (the memory mapped devices, restore), so a call repeating the
+    # previous inputs can read another word (see event.py); the cells themselves still get cached
+    feedback = True
+
+    def __init__(self, address_space=15, sparse=False):
+        """
+        :param sparse: build the registers on their first write, instead of all 2**address_space upfront
+        """
+        self.sparse = sparse
+        self.memory = SparseCells(2**address_space) if sparse else [SixteenBit() for _ in range(2**address_space)]
         self.address = [0]*address_space
         self.data = [0]*16
         self.write = 0
         self.res = self.memory[0].res
 
+    def _cell(self, idx, write):
+        if write and self.sparse:
+            return self.memory.materialize(idx)
+        return self.memory[idx]
+
     def _wiring(self):
         idx = utils.to_integer(self.address)
-        res = self.memory[idx](self.data, self.write)
+        res = self._cell(idx, self.write)(self.data, self.write)
         return res
 
     def step(self):
         res = self._wiring()
         self.res = res
 
+    def peek(self, idx):
+        """
+        the word at idx, as an unsigned int
+        """
+        return utils.to_integer(self.memory[idx].res) & 0xFFFF
+
+    def poke(self, idx, word):
+        self._cell(idx, gate.HIGH)(utils.to_machine_number(word & 0xFFFF), gate.HIGH)
+
+    def dump(self):
+        """
+        the content as an array('H')
+        """
+        words = array.array('H', bytes(2 * len(self.memory)))
+        cells = self.memory.cells.items() if self.sparse else enumerate(self.memory)
+        for idx, cell in cells:
+            if any(cell.res):
+                words[idx] = utils.to_integer(cell.res) & 0xFFFF
+        return words
+
+    def clear(self):
+        """
+        zeros every cell, writing only the ones holding something
+        """
+        if self.sparse:
+            self.memory.cells = {}
+        else:
+            for cell in self.memory:
+                if any(cell.res):
+                    cell.load(gate.ZERO)
+        self.res = self.memory[0].res
+
 
 class ROM(Memory):
-    def __init__(self, burn):
-        super().__init__()
-        if len(burn) > len(self.memory):
+    def __init__(self, burn, sparse=False):
+        super().__init__(sparse=sparse)
+        self.burn(burn)
+
+    def burn(self, image):
+        """
+        replaces the whole content with the image
+        """
+        if len(image) > len(self.memory):
             raise ValueError
 
-        for address, data in zip(self.memory, burn):
-            address(data, 1)
+        # a sparse ROM keeps the registers it already built for the words which stay non zero
+        previous = self.memory.cells if self.sparse else {}
+        self.clear()
+        for idx, data in enumerate(image):
+            if isinstance(data, int):
+                data = utils.to_machine_number(data)
+            if any(data):
+                if idx in previous:
+                    self.memory.cells[idx] = previous.pop(idx)
+                self._cell(idx, gate.HIGH).load(data)
+        self.res = self.memory[utils.to_integer(self.address)].res
+        event.invalidate()
 
     def __call__(self, address):
         self.address = address
@@ -106,8 +224,60 @@ class ROM(Memory):
 
 
 class RAM(Memory):
+    def __init__(self, sparse=False):
+        super().__init__(sparse=sparse)
+
+    def __call__(self, address, data, write_enable):
+        self.address = address
+        self.data = data
+        self.write = write_enable
+        self.step()
+        return self.res
+
+
+class Banks(gate.Device):
+    """
+    RAM of banks: the high address bits select one of the 2**select_bits banks through a demultiplexer
+    (the write enable) and a multiplexer (the output), the bank gets the low bits.
+
+    Only the selected bank is evaluated: the others get a write enable of 0 from the demultiplexer,
+    so their output is their stored word. A bank is built on its first write, until then it reads as zeros.
+    """
+    feedback = True  # poke writes the registers behind the calls, like Memory
+    bank = None  # class of the banks
+    select_bits = 3
+    bank_bits = 0  # address bits of a bank
+
     def __init__(self):
-        super().__init__()
+        self.address = [0] * (self.select_bits + self.bank_bits)
+        self.data = gate.ZERO
+        self.write = 0
+        self.res = gate.ZERO
+
+        self.banks = [None] * 2**self.select_bits
+        self.demultiplexer = gate.DemultiplexerTree(self.select_bits)
+        self.multiplexer = gate.MultiplexerTree(self.select_bits)
+
+    def _access(self, bank, address, write):
+        return bank(address, self.data, write)
+
+    def _wiring(self):
+        address = self.address[-(self.select_bits + self.bank_bits):]
+        selector = address[:self.select_bits]
+        writes = self.demultiplexer(self.write, selector)
+
+        idx = utils.to_integer(selector) & (len(self.banks) - 1)
+        bank = self.banks[idx]
+        if bank is None and writes[idx]:
+            bank = self.banks[idx] = self.bank()
+        words = [gate.ZERO if b is None else b.res for b in self.banks]
+        if bank is not None:
+            words[idx] = self._access(bank, address[self.select_bits:], writes[idx])
+        return self.multiplexer(words, selector)
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
 
     def __call__(self, address, data, write_enable):
         self.address = address
@@ -116,6 +286,151 @@ class RAM(Memory):
         self.step()
         return self.res
 
+    def register(self, idx, build=False):
+        """
+        the SixteenBit at idx, None if it was never written (and not built)
+        """
+        bank = self.banks[(idx >> self.bank_bits) & (len(self.banks) - 1)]
+        if bank is None:
+            if not build:
+                return None
+            bank = self.banks[(idx >> self.bank_bits) & (len(self.banks) - 1)] = self.bank()
+        if isinstance(bank, Banks):
+            return bank.register(idx & ((1 << self.bank_bits) - 1), build)
+        return bank
+
+    def peek(self, idx):
+        register = self.register(idx)
+        return 0 if register is None else utils.to_integer(register.res) & 0xFFFF
+
+    def poke(self, idx, word):
+        self.register(idx, build=True)(utils.to_machine_number(word & 0xFFFF), gate.HIGH)
+
+    def _dump(self, words, start):
+        for idx, bank in enumerate(self.banks):
+            if bank is None:
+                continue
+            if isinstance(bank, Banks):
+                bank._dump(words, start + (idx << self.bank_bits))
+            elif any(bank.res):
+                words[start + idx] = utils.to_integer(bank.res) & 0xFFFF
+
+    def dump(self):
+        words = array.array('H', bytes(2 * 2**(self.select_bits + self.bank_bits)))
+        self._dump(words, 0)
+        return words
+
+    def clear(self):
+        self.banks = [None] * len(self.banks)
+        self.res = gate.ZERO
+
+
+class RAM8(Banks):
+    bank = SixteenBit
+
+    def _access(self, bank, address, write):
+        return bank(self.data, write)
+
+
+class RAM64(Banks):
+    bank = RAM8
+    bank_bits = 3
+
+
+class RAM512(Banks):
+    bank = RAM64
+    bank_bits = 6
+
+
+class RAM4K(Banks):
+    bank = RAM512
+    bank_bits = 9
+
+
+class RAM16K(Banks):
+    bank = RAM4K
+    select_bits = 2
+    bank_bits = 12
+
+
+class RAM32K(Banks):
+    """
+    drop-in RAM of computer.Computer (ram=memory.RAM32K()), addressed by the low 15 bits of the bus
+    """
+    bank = RAM16K
+    select_bits = 1
+    bank_bits = 14
+
+
+class ArrayRAM(gate.Device):
+    """
+    RAM compatible memory keeping the words in a single array('H'), instead of latches.
+    The words are converted from / to bits only at the bus.
+
+    With a path the array is a memory mapped file (native byte order), so the memory of a simulation
+    can be inspected by other tools, and reloaded by opening the same file again.
+    """
+    feedback = True  # poke writes the array behind the calls, like Memory
+
+    def __init__(self, address_space=15, path=None):
+        size = 2**address_space
+        self.file = None
+        self.mmap = None
+        if path is None:
+            self.words = array.array('H', bytes(2 * size))
+        else:
+            self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+            if os.fstat(self.file.fileno()).st_size < 2 * size:
+                self.file.truncate(2 * size)
+            self.mmap = mmap.mmap(self.file.fileno(), 2 * size)
+            self.words = memoryview(self.mmap).cast('H')
+
+        self.address = [0]*address_space
+        self.data = [0]*16
+        self.write = 0
+        self.res = gate.Word(self.words[0])
+
+    def _wiring(self):
+        idx = utils.to_integer(self.address) % len(self.words)
+        if self.write:
+            self.words[idx] = utils.to_integer(self.data) & 0xFFFF
+        return gate.Word(self.words[idx])
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, address, data, write_enable):
+        self.address = address
+        self.data = data
+        self.write = write_enable
+        self.step()
+        return self.res
+
+    def peek(self, idx):
+        return self.words[idx]
+
+    def poke(self, idx, word):
+        self.words[idx] = word & 0xFFFF
+
+    def dump(self):
+        return array.array('H', self.words)
+
+    def clear(self):
+        self.words[:] = array.array('H', bytes(2 * len(self.words)))
+        self.res = gate.Word(self.words[0])
+
+    def flush(self):
+        if self.mmap is not None:
+            self.mmap.flush()
+
+    def close(self):
+        if self.mmap is not None:
+            self.words.release()
+            self.mmap.close()
+            self.file.close()
+            self.mmap = None
+
 
 def flip_flop_test():
     import time
@@ -206,6 +521,73 @@ def _burn_test():
     c.power_off()
 
 
+def _banks_test():
+    import random
+    from nandcomp import computer
+    from nandcomp import emulator
+
+    random.seed(0)
+    ram = RAM32K()
+    words = {}
+    for _ in range(200):
+        idx = random.choice([random.randrange(2**15), *words])
+        write = random.randint(0, 1)
+        word = random.randrange(2**16)
+        res = ram(utils.to_machine_number(idx), utils.to_machine_number(word), write)
+        if write:
+            words[idx] = word
+        assert utils.to_integer(res) & 0xFFFF == words.get(idx, 0)
+    assert all(ram.peek(idx) == word for idx, word in words.items())
+    assert ram.dump() == array.array('H', (words.get(idx, 0) for idx in range(2**15)))
+    assert sum(isinstance(device, SixteenBit) for _, device in gate.walk(ram)) == len(words)
+
+    image = utils.create_image(computer.SUM100)
+    emulator.lockstep(computer.Computer(image, sparse=True, ram=RAM32K()), emulator.Emulator(image), 200)
+
+
+def _array_ram_test():
+    import os
+    import random
+    import tempfile
+
+    random.seed(0)
+    ram = ArrayRAM()
+    words = {}
+    for _ in range(200):
+        idx = random.choice([random.randrange(2**15), *words])
+        write = random.randint(0, 1)
+        word = random.randrange(2**16)
+        res = ram(utils.to_machine_number(idx), utils.to_machine_number(word), write)
+        if write:
+            words[idx] = word
+        assert utils.to_integer(res) & 0xFFFF == words.get(idx, 0)
+    assert all(ram.peek(idx) == word for idx, word in words.items())
+    assert ram.dump() == array.array('H', (words.get(idx, 0) for idx in range(2**15)))
+    ram.clear()
+    assert not any(ram.dump()) and not any(ram.res)
+
+    # the words stay in the file, and are back when it is opened again
+    path = os.path.join(tempfile.mkdtemp(), 'ram.bin')
+    ram = ArrayRAM(path=path)
+    for idx, word in words.items():
+        ram(utils.to_machine_number(idx), utils.to_machine_number(word), 1)
+    ram.poke(2**15 - 1, -1)
+    ram.flush()
+    ram.close()
+    assert os.path.getsize(path) == 2 * 2**15
+
+    ram = ArrayRAM(path=path)
+    assert all(ram.peek(idx) == word for idx, word in words.items()) and ram.peek(2**15 - 1) == 0xFFFF
+    assert utils.to_integer(ram(utils.to_machine_number(2**15 - 1), [0]*16, 0)) & 0xFFFF == 0xFFFF
+    ram.clear()
+    ram.close()
+    ram = ArrayRAM(path=path)
+    assert not any(ram.dump())
+    ram.close()
+
+
 if __name__ == '__main__':
+    _banks_test()
+    _array_ram_test()
     flip_flop_test()
     _burn_test()
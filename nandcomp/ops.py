@@ -74,13 +74,13 @@ class FullAdd16Bit(gate.Device):
 
     def _wiring(self):
         # read the 16 bit inputs in reverse
-        res = []
+        res = [0] * 16
         lsb, carry = self.half_add(self.xs[15], self.ys[15])
-        res.insert(0, lsb)
+        res[15] = lsb
 
         for idx in range(14, -1, -1):
             digit, carry = self.adders[idx](self.xs[idx], self.ys[idx], carry)
-            res.insert(0, digit)
+            res[idx] = digit
         return res
 
     def step(self):
@@ -105,11 +105,11 @@ class Increment2bit(gate.Device):
         self.res = []
 
     def _wiring(self):
-        res = []
-        lsb, carry = self.half_add(self.xs[1], 1)
-        res.insert(0, lsb)
+        res = [0] * 2
+        lsb, carry = self.half_add(self.xs[1], gate.HIGH)
+        res[1] = lsb
         digit, _ = self.full_add(self.xs[0], 0, carry)
-        res.insert(0, digit)
+        res[0] = digit
         return res
 
     def step(self):
@@ -123,14 +123,43 @@ class Increment2bit(gate.Device):
 
 
 class Increment16bit(gate.Device):
+    def __init__(self, adder=FullAdd16Bit):
+        self.xs = None
+        self.one = (0,)*15 + (gate.HIGH,)
+        self.adder = adder()
+        self.res = []
+
+    def _wiring(self):
+        res = self.adder(self.xs, self.one)
+        return res
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, xs):
+        self.xs = xs
+        self.step()
+        return self.res
+
+
+class HalfAddIncrement16bit(gate.Device):
+    """
+    xs + 1 as a chain of half adders: the constant operand of Increment16bit adds nothing but gates
+    """
     def __init__(self):
         self.xs = None
-        self.adder = FullAdd16Bit()
+        self.not_ = gate.Not()
+        self.half_adds = [HalfAdd() for _ in range(15)]
         self.res = []
 
     def _wiring(self):
-        one = [0]*15 + [1]
-        res = self.adder(self.xs, one)
+        res = [0] * 16
+        res[15] = self.not_(self.xs[15])
+        carry = self.xs[15]
+        for idx in range(14, -1, -1):
+            digit, carry = self.half_adds[idx](self.xs[idx], carry)
+            res[idx] = digit
         return res
 
     def step(self):
@@ -143,16 +172,327 @@ class Increment16bit(gate.Device):
         return self.res
 
 
+class NandXor(gate.SimpleGate2):
+    """
+    xor of 4 nands (gate.Xor takes 9)
+    """
+    def __init__(self):
+        super().__init__()
+        self.nands = [gate.Nand() for _ in range(4)]
+
+    def _wiring(self):
+        both = self.nands[0](self.x, self.y)
+        a = self.nands[1](self.x, both)
+        b = self.nands[2](self.y, both)
+        return self.nands[3](a, b)
+
+
+class MultiNand(gate.Device):
+    """
+    nand of n inputs, the first n - 1 anded as a balanced tree
+    """
+    def __init__(self, n):
+        self.xs = []
+        self.res = 0
+
+        self.ands = [gate.And() for _ in range(max(n - 2, 0))]
+        self.nand = gate.Nand()
+
+    def _wiring(self):
+        if len(self.xs) == 1:
+            return self.nand(self.xs[0], self.xs[0])
+
+        level = list(self.xs[:-1])
+        ands = iter(self.ands)
+        while len(level) > 1:
+            paired = [next(ands)(level[idx], level[idx + 1]) for idx in range(0, len(level) - 1, 2)]
+            level = paired + level[len(paired) * 2:]
+        return self.nand(level[0], self.xs[-1])
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, xs):
+        self.xs = xs
+        self.step()
+        return self.res
+
+
+class PropagateGenerate(gate.Device):
+    """
+    (p, g) = (x xor y, x and y) of one bit position, 5 nands
+    """
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.p = 0
+        self.g = 0
+        self.nands = [gate.Nand() for _ in range(5)]
+
+    def _wiring(self):
+        both = self.nands[0](self.x, self.y)
+        a = self.nands[1](self.x, both)
+        b = self.nands[2](self.y, both)
+        return self.nands[3](a, b), self.nands[4](both, both)
+
+    def step(self):
+        p, g = self._wiring()
+        self.p = p
+        self.g = g
+
+    def __call__(self, x, y):
+        self.x = x
+        self.y = y
+        self.step()
+        return self.p, self.g
+
+
+class PrefixCell(gate.Device):
+    """
+    combines the (p, g) of a span with the one right below it:
+    G = g_high or (p_high and g_low), P = p_high and p_low
+    """
+    def __init__(self):
+        self.p_high = 0
+        self.g_high = 0
+        self.p_low = 0
+        self.g_low = 0
+        self.p = 0
+        self.g = 0
+        self.nands = [gate.Nand() for _ in range(5)]
+
+    def _wiring(self):
+        not_g = self.nands[0](self.g_high, self.g_high)
+        carried = self.nands[1](self.p_high, self.g_low)
+        g = self.nands[2](not_g, carried)
+        both = self.nands[3](self.p_high, self.p_low)
+        return self.nands[4](both, both), g
+
+    def step(self):
+        p, g = self._wiring()
+        self.p = p
+        self.g = g
+
+    def __call__(self, p_high, g_high, p_low, g_low):
+        self.p_high = p_high
+        self.g_high = g_high
+        self.p_low = p_low
+        self.g_low = g_low
+        self.step()
+        return self.p, self.g
+
+
+class LookaheadCarries(gate.Device):
+    """
+    carries c1..cn out of bit positions 0..n-1, each as a two level sum of products:
+        c(i+1) = g(i) or p(i) g(i-1) or ... or p(i)..p(0) c0
+    c0 comes last into both levels, 2 nands away from the carries
+    """
+    def __init__(self, n):
+        self.ps = []
+        self.gs = []
+        self.carry = 0
+        self.res = []
+
+        # term j of carry i + 1: g(j) and p(j + 1)..p(i), the last term p(0)..p(i) and c0
+        self.terms = [MultiNand(size) for i in range(n) for size in [i - j + 1 for j in range(i + 1)] + [i + 2]]
+        self.sums = [MultiNand(i + 2) for i in range(n)]
+
+    def _wiring(self):
+        res = [0] * len(self.sums)
+        terms = iter(self.terms)
+        for i in range(len(self.sums)):
+            products = [next(terms)([self.gs[j]] + list(self.ps[j + 1:i + 1])) for j in range(i + 1)]
+            products.append(next(terms)(list(self.ps[:i + 1]) + [self.carry]))
+            res[i] = self.sums[i](products)
+        return res
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, ps, gs, carry):
+        self.ps = ps
+        self.gs = gs
+        self.carry = carry
+        self.step()
+        return self.res
+
+
+class GroupPropagateGenerate(gate.Device):
+    """
+    (P, G) of a group of bit positions 0..n-1:
+    P = p(n-1)..p(0), G = g(n-1) or p(n-1) g(n-2) or ... or p(n-1)..p(1) g(0)
+    """
+    def __init__(self, n):
+        self.ps = []
+        self.gs = []
+        self.p = 0
+        self.g = 0
+
+        self.propagate = MultiNand(n)
+        self.not_ = gate.Not()
+        self.terms = [MultiNand(n - j) for j in range(n)]
+        self.sum = MultiNand(n)
+
+    def _wiring(self):
+        p = self.not_(self.propagate(self.ps))
+        terms = [self.terms[j]([self.gs[j]] + list(self.ps[j + 1:])) for j in range(len(self.terms))]
+        return p, self.sum(terms)
+
+    def step(self):
+        p, g = self._wiring()
+        self.p = p
+        self.g = g
+
+    def __call__(self, ps, gs):
+        self.ps = ps
+        self.gs = gs
+        self.step()
+        return self.p, self.g
+
+
+class CarryLookahead16Bit(gate.Device):
+    """
+    Two level carry lookahead: four 4 bit groups, the group carries looked ahead from the group (P, G)s.
+    Drop-in for FullAdd16Bit.
+    """
+    def __init__(self):
+        self.xs = None
+        self.ys = None
+        self.res = []
+
+        self.bits = [PropagateGenerate() for _ in range(16)]
+        self.groups = [GroupPropagateGenerate(4) for _ in range(3)]
+        self.group_carries = LookaheadCarries(3)
+        self.carries = [LookaheadCarries(3) for _ in range(4)]
+        self.xors = [NandXor() for _ in range(15)]
+
+    def _wiring(self):
+        # bit positions, lsb first
+        ps, gs = [0] * 16, [0] * 16
+        for pos in range(16):
+            ps[pos], gs[pos] = self.bits[pos](self.xs[15 - pos], self.ys[15 - pos])
+
+        group_ps, group_gs = [0] * 3, [0] * 3
+        for k in range(3):
+            group_ps[k], group_gs[k] = self.groups[k](ps[4*k:4*k + 4], gs[4*k:4*k + 4])
+        carry_in = [0] + self.group_carries(group_ps, group_gs, 0)
+
+        res = [0] * 16
+        res[15] = ps[0]
+        for k in range(4):
+            carries = [carry_in[k]] + self.carries[k](ps[4*k:4*k + 3], gs[4*k:4*k + 3], carry_in[k])
+            for pos in range(4*k, 4*k + 4):
+                if pos:
+                    res[15 - pos] = self.xors[pos - 1](ps[pos], carries[pos - 4*k])
+        return res
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+        self.step()
+        return self.res
+
+
+class PrefixAdder16Bit(gate.Device):
+    """
+    Parallel prefix adder: the carry into bit i + 1 is the G of the span 0..i,
+    built by combining spans level by level, `levels` listing the (i, j) pairs combined on each:
+    the span ending at i takes in the one ending at j.
+    """
+    levels = []
+
+    def __init__(self):
+        self.xs = None
+        self.ys = None
+        self.res = []
+
+        self.bits = [PropagateGenerate() for _ in range(16)]
+        self.cells = [PrefixCell() for level in self.levels for _ in level]
+        self.xors = [NandXor() for _ in range(15)]
+
+    def _wiring(self):
+        ps, gs = [0] * 16, [0] * 16
+        for pos in range(16):
+            ps[pos], gs[pos] = self.bits[pos](self.xs[15 - pos], self.ys[15 - pos])
+
+        span_ps, span_gs = list(ps), list(gs)
+        cells = iter(self.cells)
+        for level in self.levels:
+            # every pair of a level reads the spans of the level before
+            combined = [next(cells)(span_ps[i], span_gs[i], span_ps[j], span_gs[j]) for i, j in level]
+            for (i, _), (p, g) in zip(level, combined):
+                span_ps[i], span_gs[i] = p, g
+
+        res = [0] * 16
+        res[15] = ps[0]
+        for pos in range(1, 16):
+            res[15 - pos] = self.xors[pos - 1](ps[pos], span_gs[pos - 1])
+        return res
+
+    def step(self):
+        res = self._wiring()
+        self.res = res
+
+    def __call__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+        self.step()
+        return self.res
+
+
+class KoggeStone16Bit(PrefixAdder16Bit):
+    """
+    every span doubles on every level: 4 levels, 49 cells
+    """
+    levels = [[(i, i - d) for i in range(d, 16)] for d in (1, 2, 4, 8)]
+
+
+class BrentKung16Bit(PrefixAdder16Bit):
+    """
+    a tree up to the powers of two, then back down to the rest: 7 levels, 26 cells
+    """
+    levels = ([[(i, i - d) for i in range(2*d - 1, 16, 2*d)] for d in (1, 2, 4, 8)] +
+              [[(i, i - d) for i in range(3*d - 1, 16, 2*d)] for d in (4, 2, 1)])
+
+
+ADDERS = [FullAdd16Bit, CarryLookahead16Bit, KoggeStone16Bit, BrentKung16Bit]
+INCREMENTERS = [Increment16bit, HalfAddIncrement16bit]
+
+
+def report():
+    """
+    (name, nands, compiled nands, depth) of every adder and incrementer:
+    the nands a call evaluates, and the nand count and depth once flattened by the compiler
+    (constants folded, shared gates merged)
+    """
+    from nandcomp import compiler
+
+    rows = []
+    for device, args in [(adder, ([0]*16, [0]*16)) for adder in ADDERS] + \
+                        [(incrementer, ([0]*16,)) for incrementer in INCREMENTERS]:
+        nands = sum(1 for _, d in gate.walk(device()) if isinstance(d, gate.Nand))
+        netlist = compiler.trace(device(), *args)
+        rows.append((device.__name__, nands, netlist.nand_count, netlist.depth()))
+    return rows
+
+
 class TWosComplement(gate.SimpleGate1):
     def __init__(self):
         super().__init__()
+        self.one = (0,)*15 + (gate.HIGH,)
         self.full_16bit_adder = FullAdd16Bit()
         self.not_ = gate.BitwiseOp1(gate.Not)
 
     def _wiring(self):
-        one = [0]*15 + [1]
         inverted = self.not_(self.x)
-        res = self.full_16bit_adder(inverted, one)
+        res = self.full_16bit_adder(inverted, self.one)
         return res
 
 
@@ -211,6 +551,47 @@ def main():
         x = c.device.res
     c.power_off()
 
+    print('-'*48)
+    print(f'{"adder":24}{"nands":>7}{"compiled":>10}{"depth":>7}')
+    for name, nands, compiled, depth in report():
+        print(f'{name:24}{nands:7}{compiled:10}{depth:7}')
+
+
+def _ops_test():
+    import random
+    from nandcomp import cu
+    from nandcomp import utils
+
+    word = lambda bits: utils.to_integer(bits) & 0xFFFF
+    bits = utils.to_machine_number
+
+    # carries out of the msb, through every position, and stopping on alternating bits
+    edges = [(0xFFFF, 1), (0x8000, 0x8000), (0xAAAA, 0x5555), (0x5555, 0x5555), (0xAAAA, 0xAAAA), (0xFFFF, 0xFFFF),
+             (0, 0), (0x7FFF, 1)]
+    rng = random.Random(0)
+    pairs = edges + [(rng.randrange(2**16), rng.randrange(2**16)) for _ in range(48)]
+    reference = FullAdd16Bit()
+    for x, y in edges:
+        assert word(reference(bits(x), bits(y))) == (x + y) & 0xFFFF
+        assert word(reference(gate.Word(x), gate.Word(y))) == (x + y) & 0xFFFF
+    for adder in ADDERS[1:]:
+        device = adder()
+        for x, y in pairs:
+            assert device(bits(x), bits(y)) == reference(bits(x), bits(y)), (adder.__name__, x, y)
+
+    for incrementer in INCREMENTERS:
+        device = incrementer()
+        for x in [0, 1, 0x7FFF, 0x8000, 0xAAAA, 0xFFFF] + [rng.randrange(2**16) for _ in range(16)]:
+            assert word(device(bits(x))) == (x + 1) & 0xFFFF, (incrementer.__name__, x)
+
+    for incrementer in INCREMENTERS:
+        pc = cu.ProgramCounter(incrementer=incrementer)
+        pc(0, 1, bits(0xFFFD), 0)
+        counted = [word(pc(1, 0, gate.ZERO, 0)) for _ in range(4)]
+        assert counted == [0xFFFE, 0xFFFF, 0, 1], (incrementer.__name__, counted)
+        assert word(pc(1, 0, gate.ZERO, 1)) == 0
+
 
 if __name__ == '__main__':
+    _ops_test()
     main()
@@ -1,13 +1,313 @@
+"""
+Memory mapped devices of computer.Computer, at the addresses of the Hack platform.
+
+    SCREEN  16384..24575  512 x 256 pixels, 32 words per row, the lsb of a word is its leftmost pixel, 1 is black
+    KBD     24576         the code of the key held down, 0 when none
+    SERIAL  24577, 24578  SerialConsole TX and RX (not Hack: attached with Computer.attach)
+    TIMER   24579         Timer ticks (not Hack: attached with Computer.attach)
+
+The Computer updates its devices before every RAM access, and reports the RAM writes into their ranges:
+Screen keeps a copy of the screen words and the rows changed since the last render, the renderers only redraw
+those rows. The inputs (keys, serial characters, timer ticks) come from queues, which any thread can feed
+without blocking.
+"""
+import array
+import os
+import queue
+import sys
+
+SCREEN = 16384
+KBD = 24576
+SERIAL = 24577  # TX, then RX
+TIMER = 24579
+WIDTH = 512
+HEIGHT = 256
+ROW_WORDS = WIDTH // 16
+
+# codes of the special keys
+KEYS = {
+    'newline': 128, 'backspace': 129, 'left': 130, 'up': 131, 'right': 132, 'down': 133, 'home': 134, 'end': 135,
+    'page up': 136, 'page down': 137, 'insert': 138, 'delete': 139, 'esc': 140,
+    **{f'f{idx}': 140 + idx for idx in range(1, 13)},
+}
+
+# the byte with its bits in the reverse order: the lsb first pixel of a word --> the msb first pixel of a PBM byte
+_REVERSED = bytes(int(f'{byte:08b}'[::-1], 2) for byte in range(256))
+
+
 class MemoryMappedDevice:
+    base = 0
+    size = 0
+
     def __init__(self, memory):
         self.memory = memory
 
+    def maps(self, address):
+        return self.base <= address < self.base + self.size
+
+    def update(self):
+        """
+        called before every RAM access, to put the input of the device into the memory
+        """
+
+    def write(self, address, word):
+        """
+        the RAM word at address (in the range of the device) was written
+        """
+
+    def refresh(self):
+        """
+        reads the state of the device back from the memory, after it changed without update() or write()
+        """
+
 
 class Screen(MemoryMappedDevice):
+    base = SCREEN
+    size = ROW_WORDS * HEIGHT
+
     def __init__(self, memory):
         super().__init__(memory)
+        self.words = array.array('H', bytes(2 * self.size))
+        self.dirty = {}  # row --> (first, last) word of the row written since the last changes()
+
+    def write(self, address, word):
+        offset = address - self.base
+        if self.words[offset] == word:
+            return
+        self.words[offset] = word
+        row, column = divmod(offset, ROW_WORDS)
+        span = self.dirty.get(row)
+        self.dirty[row] = (column, column) if span is None else (min(span[0], column), max(span[1], column))
+
+    def refresh(self):
+        words = self.memory.dump()[self.base:self.base + self.size]
+        for offset in range(self.size):
+            if words[offset] != self.words[offset]:
+                self.write(self.base + offset, words[offset])
+
+    def changes(self):
+        """
+        the (row, first word, last word) written since the previous call, by row
+        """
+        dirty, self.dirty = self.dirty, {}
+        return sorted((row, first, last) for row, (first, last) in dirty.items())
+
+    def pixel(self, x, y):
+        return (self.words[y * ROW_WORDS + x // 16] >> (x % 16)) & 1
 
 
 class Keyboard(MemoryMappedDevice):
+    base = KBD
+    size = 1
+
+    def __init__(self, memory):
+        super().__init__(memory)
+        self.keys = queue.SimpleQueue()
+        self.key = 0
+
+    def press(self, key):
+        """
+        :param key: a character, a name of KEYS or a code
+        """
+        if isinstance(key, str):
+            key = KEYS[key] if key in KEYS else ord(key)
+        self.keys.put(key)
+
+    def release(self):
+        self.keys.put(0)
+
+    def refresh(self):
+        self.key = self.memory.peek(self.base)
+
+    def update(self):
+        if self.keys.empty():
+            return
+        key = self.key
+        while not self.keys.empty():
+            key = self.keys.get_nowait()
+        if key != self.key:
+            self.key = key
+            self.memory.poke(self.base, key)
+
+
+class SerialConsole(MemoryMappedDevice):
+    """
+    Two words: TX, a word written there is sent to the host (a character code),
+    RX, the next character received from the host, 0 when none. The program writes 0 into RX once it took the
+    character, the next one is put there before the following RAM access.
+    """
+    base = SERIAL
+    size = 2
+
+    def __init__(self, memory):
+        super().__init__(memory)
+        self.received = queue.SimpleQueue()  # host --> machine
+        self.sent = queue.SimpleQueue()  # machine --> host
+        self.rx = 0
+
+    def send(self, text):
+        """
+        queues the characters (str) or codes for the program
+        """
+        for char in text:
+            self.received.put(ord(char) if isinstance(char, str) else char)
+
+    def write(self, address, word):
+        if address == self.base:
+            self.sent.put(word)
+        else:
+            self.rx = word
+
+    def refresh(self):
+        self.rx = self.memory.peek(self.base + 1)
+
+    def update(self):
+        if not self.rx and not self.received.empty():
+            self.rx = self.received.get_nowait()
+            self.memory.poke(self.base + 1, self.rx)
+
+
+class Timer(MemoryMappedDevice):
+    """
+    a word counting the ticks (modulo 2**16), tick() can be called from any thread
+    """
+    base = TIMER
+    size = 1
+
     def __init__(self, memory):
         super().__init__(memory)
+        self.ticks = queue.SimpleQueue()
+        self.count = 0
+
+    def tick(self):
+        self.ticks.put(1)
+
+    def refresh(self):
+        self.count = self.memory.peek(self.base)
+
+    def update(self):
+        if self.ticks.empty():
+            return
+        while not self.ticks.empty():
+            self.count = (self.count + self.ticks.get_nowait()) & 0xFFFF
+        self.memory.poke(self.base, self.count)
+
+
+class PbmRenderer:
+    """
+    writes the screen as binary PBM frames (frame_00000.pbm, ...) into a directory, a frame per render
+    with changes; a frame is a 16K image buffer where only the changed rows are converted
+    """
+    def __init__(self, screen, directory):
+        self.screen = screen
+        self.directory = directory
+        self.frames = 0
+        self.header = f'P4\n{WIDTH} {HEIGHT}\n'.encode()
+        self.image = bytearray(WIDTH // 8 * HEIGHT)
+        os.makedirs(directory, exist_ok=True)
+
+    def _convert(self, row, first, last):
+        words = self.screen.words
+        start = row * ROW_WORDS
+        for column in range(first, last + 1):
+            word = words[start + column]
+            self.image[2 * (start + column)] = _REVERSED[word & 0xFF]
+            self.image[2 * (start + column) + 1] = _REVERSED[word >> 8]
+
+    def render(self):
+        """
+        the path of the written frame, None when nothing changed
+        """
+        changes = self.screen.changes()
+        if not changes:
+            return None
+        for row, first, last in changes:
+            self._convert(row, first, last)
+        path = os.path.join(self.directory, f'frame_{self.frames:05}.pbm')
+        with open(path, 'wb') as file:
+            file.write(self.header)
+            file.write(self.image)
+        self.frames += 1
+        return path
+
+
+class TerminalRenderer:
+    """
+    draws the screen with half block characters, a text line for 2 pixel rows,
+    rewriting only the lines of the changed rows (ANSI cursor moves)
+    """
+    _blocks = (' ', '▀', '▄', '█')  # (top, bottom) pixels: 00, 10, 01, 11
+
+    def __init__(self, screen, write=None):
+        """
+        :param write: function writing the text out, sys.stdout.write by default
+        """
+        self.screen = screen
+        self.write = sys.stdout.write if write is None else write
+
+    def line(self, idx):
+        top = [self.screen.pixel(x, 2 * idx) for x in range(WIDTH)]
+        bottom = [self.screen.pixel(x, 2 * idx + 1) for x in range(WIDTH)]
+        return ''.join(self._blocks[t | b << 1] for t, b in zip(top, bottom))
+
+    def render(self):
+        """
+        the number of lines redrawn
+        """
+        lines = sorted({row // 2 for row, _, _ in self.screen.changes()})
+        if lines:
+            self.write(''.join(f'\x1b[{idx + 1};1H{self.line(idx)}' for idx in lines))
+        return len(lines)
+
+
+def _peripheral_test():
+    import tempfile
+    from nandcomp import computer
+    from nandcomp import utils
+
+    # draws a 16 pixel line at the top left, then copies the key held down to RAM[0] until it is 'q'
+    program = [
+        0b0100000000000000,  # @SCREEN
+        0b1110111010001000,  # M = -1
+        0b0110000000000000,  # @KBD      (2)
+        0b1111110000010000,  # D = M
+        0b0000000000000000,  # @0
+        0b1110001100001000,  # M = D
+        0b0000000001110001,  # @113 ('q')
+        0b1110010011010000,  # D = D - A
+        0b0000000000000010,  # @2
+        0b1110001100000101,  # D;JNE
+        0b0000000000001010,  # @10
+        0b1110101010000111,  # 0;JMP
+    ]
+    machine = computer.Computer(utils.create_image(program), sparse=True)
+    frames = PbmRenderer(machine.screen, tempfile.mkdtemp())
+    lines = []
+    terminal = TerminalRenderer(machine.screen, lines.append)
+
+    for _ in range(4):
+        machine.step()
+    assert machine.screen.words[0] == 0xFFFF and machine.screen.pixel(0, 0) and not machine.screen.pixel(16, 0)
+    assert machine.screen.dirty == {0: (0, 0)}
+    path = frames.render()
+    assert frames.render() is None
+    with open(path, 'rb') as file:
+        image = file.read()[len(frames.header):]
+    assert image[:2] == b'\xff\xff' and not any(image[2:])
+
+    machine.keyboard.press('a')
+    for _ in range(12):
+        machine.step()
+    assert machine.RAM.peek(0) == ord('a')
+    machine.keyboard.press('q')
+    for _ in range(12):
+        machine.step()
+    assert machine.RAM.peek(0) == ord('q') and utils.to_integer(machine.PC_bus) in (10, 11)
+
+    machine.RAM.poke(SCREEN + 32 * 255 + 31, 1 << 15)
+    machine.screen.refresh()
+    assert terminal.render() == 1 and lines[0].startswith('\x1b[128;1H') and lines[0].endswith('▄')
+
+
+if __name__ == '__main__':
+    _peripheral_test()
@@ -0,0 +1,154 @@
+"""
+Per component profile of the device calls: counts, nand evaluations and wall time, per instance path
+(e.g. 'Computer.CPU.ALU.adder.adders[7].half_add1.xor') and per class.
+
+    with profiler.Profile(computer) as prof:
+        for _ in range(100):
+            computer.step()
+    print(prof.report())
+    open('computer.folded', 'w').write(prof.collapsed())  # flamegraph.pl / speedscope input
+
+It patches __call__ on the gate.Device classes while active (see hooks.py), so it costs nothing once stopped.
+Devices the root does not reach by attributes (e.g. sparse memory cells) are named by their class under the caller.
+"""
+import time
+from collections import namedtuple
+
+from nandcomp import gate
+from nandcomp import hooks
+
+Entry = namedtuple('Entry', ['cls', 'calls', 'nands', 'seconds', 'self_nands', 'self_seconds'])
+
+
+class Profile:
+    def __init__(self, root=None):
+        """
+        :param root: the device the paths start from (any device called while profiling is counted)
+        """
+        self.root = root
+        self.entries = {}  # path -> [class name, calls, nands, seconds, self nands, self seconds]
+        self._patch = hooks.Patch()
+        self._paths = {}
+        self._stack = []   # [path, nands of the children, seconds of the children] of the calls in progress
+
+    def _profiled(self, call):
+        paths, stack, entries = self._paths, self._stack, self.entries
+        clock = time.perf_counter
+        nand = gate.Nand
+
+        def __call__(device, *args, **kwargs):
+            path = paths.get(id(device))
+            if path is None:
+                name = type(device).__name__
+                path = f'{stack[-1][0]}.{name}' if stack else name
+            frame = [path, 0, 0.0]
+            stack.append(frame)
+            start = clock()
+            try:
+                return call(device, *args, **kwargs)
+            finally:
+                seconds = clock() - start
+                stack.pop()
+                nands = frame[1] + (type(device) is nand)
+
+                entry = entries.get(path)
+                if entry is None:
+                    entry = entries[path] = [type(device).__name__, 0, 0, 0.0, 0, 0.0]
+                entry[1] += 1
+                entry[2] += nands
+                entry[3] += seconds
+                entry[4] += nands - frame[1]
+                entry[5] += seconds - frame[2]
+                if stack:
+                    stack[-1][1] += nands
+                    stack[-1][2] += seconds
+        return __call__
+
+    def start(self):
+        if self._patch:
+            return
+        self._paths = {id(device): path for path, device in gate.walk(self.root)} if self.root is not None else {}
+        for cls in hooks.device_classes():
+            own = cls.__dict__.get('__call__')
+            if own is not None:
+                self._patch.set(cls, self._profiled(own))
+
+    def stop(self):
+        self._patch.undo()
+        self._stack.clear()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def stats(self):
+        """
+        path -> Entry, the nands and seconds of a path include its components, the self_ ones do not
+        """
+        return {path: Entry(*entry) for path, entry in self.entries.items()}
+
+    def by_class(self):
+        """
+        class name -> Entry, summing the self nands and seconds (nested devices of a class are not counted twice)
+        """
+        classes = {}
+        for cls, calls, _, _, self_nands, self_seconds in self.entries.values():
+            total = classes.setdefault(cls, [cls, 0, 0, 0.0])
+            total[1] += calls
+            total[2] += self_nands
+            total[3] += self_seconds
+        return {cls: Entry(cls, calls, nands, seconds, nands, seconds) for cls, calls, nands, seconds in classes.values()}
+
+    def report(self, limit=20):
+        lines = [f'{"path":64}{"calls":>9}{"nands":>10}{"ms":>10}{"self ms":>10}']
+        entries = sorted(self.stats.items(), key=lambda item: -item[1].seconds)[:limit]
+        lines += [f'{path[-64:]:64}{e.calls:9}{e.nands:10}{e.seconds * 1e3:10.1f}{e.self_seconds * 1e3:10.1f}'
+                  for path, e in entries]
+
+        lines.append('')
+        lines.append(f'{"class":32}{"calls":>9}{"nands":>10}{"self ms":>10}')
+        classes = sorted(self.by_class().values(), key=lambda e: -e.self_seconds)[:limit]
+        lines += [f'{e.cls:32}{e.calls:9}{e.nands:10}{e.self_seconds * 1e3:10.1f}' for e in classes]
+        return '\n'.join(lines)
+
+    def collapsed(self, unit=1e-6):
+        """
+        the self time of every path in the collapsed stack format ('a;b;c count' lines), in microseconds
+        """
+        lines = []
+        for path, entry in self.stats.items():
+            count = round(entry.self_seconds / unit)
+            if count:
+                lines.append(f'{path.replace(".", ";")} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _profile_test():
+    from nandcomp import computer
+    from nandcomp import utils
+
+    machine = computer.Computer(utils.create_image(computer.SUM100), sparse=True)
+    call = gate.Nand.__call__
+
+    with Profile(machine) as prof:
+        for _ in range(8):
+            machine.step()
+    assert gate.Nand.__call__ is call
+
+    stats = prof.stats
+    adder = stats['Computer.CPU.ALU.adder']
+    assert adder.calls == 8 and adder.nands == 8 * 386
+    assert stats['Computer.CPU.ALU.adder.adders[7].half_add1.xor'].calls == 8
+    assert sum(e.self_nands for e in stats.values()) == stats['Computer.CPU'].nands + sum(
+        e.nands for path, e in stats.items() if path.startswith(('Computer.ROM', 'Computer.RAM')) and path.count('.') == 1)
+    assert prof.by_class()['Nand'].calls == prof.by_class()['Nand'].nands
+    assert 'Computer;CPU;ALU;adder' in prof.collapsed()
+    print(prof.report(limit=10))
+
+
+if __name__ == '__main__':
+    _profile_test()
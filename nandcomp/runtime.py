@@ -0,0 +1,167 @@
+"""
+Runs computer.Computer machines on an asyncio event loop.
+
+The cycles run in batches on an executor, one shared worker thread by default, the loop gets control back between
+the batches: many machines share the loop and the worker, and the coroutines feeding their devices
+(keys, serial characters, timer ticks) run between the batches.
+
+    async def main():
+        machine = computer.Computer(image, compiled=True, sparse=True)
+        console = machine.attach(peripheral.SerialConsole(machine.RAM))
+        runtime = Runtime(machine)
+        console.send('hello')
+        task = asyncio.create_task(runtime.run())
+        print(await read(console, 5))
+        runtime.stop()
+        await task
+
+    asyncio.run(main())
+"""
+import asyncio
+import concurrent.futures
+
+_executor = None
+
+
+def shared_executor():
+    """
+    the single worker thread shared by the runtimes
+    """
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='nandcomp')
+    return _executor
+
+
+class Runtime:
+    # steps per executor call, the devices are fed between them
+    batch = 256
+
+    def __init__(self, computer, executor=None):
+        """
+        :param executor: concurrent.futures executor running the batches, shared_executor() by default
+        """
+        self.computer = computer
+        self.executor = shared_executor() if executor is None else executor
+        self.cycles = 0
+        self._stopped = False
+
+    def _steps(self, n):
+        step = self.computer.step
+        for _ in range(n):
+            step()
+
+    async def run(self, cycles=None):
+        """
+        steps until cycles were run (forever when None) or stop() is called, returns the cycles run
+        """
+        self._stopped = False
+        loop = asyncio.get_running_loop()
+        done = 0
+        while not self._stopped and (cycles is None or done < cycles):
+            n = self.batch if cycles is None else min(self.batch, cycles - done)
+            await loop.run_in_executor(self.executor, self._steps, n)
+            done += n
+            self.cycles += n
+        return done
+
+    def stop(self):
+        """
+        the running run() returns after the batch in progress
+        """
+        self._stopped = True
+
+
+async def type_text(keyboard, text, hold=0.01):
+    """
+    presses and releases the keys of text, every key held down for hold seconds and released as long
+    """
+    for key in text:
+        keyboard.press(key)
+        await asyncio.sleep(hold)
+        keyboard.release()
+        await asyncio.sleep(hold)
+
+
+async def tick(timer, interval):
+    """
+    ticks the timer every interval seconds, until cancelled
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    while True:
+        deadline += interval
+        await asyncio.sleep(max(deadline - loop.time(), 0))
+        timer.tick()
+
+
+async def read(console, count, poll=0.001):
+    """
+    the next count characters sent by the program to the serial console, as a str
+    """
+    chars = []
+    while len(chars) < count:
+        if console.sent.empty():
+            await asyncio.sleep(poll)
+        else:
+            chars.append(chr(console.sent.get_nowait()))
+    return ''.join(chars)
+
+
+def _runtime_test():
+    from nandcomp import computer
+    from nandcomp import peripheral
+    from nandcomp import utils
+
+    # sends back every character received, upper cased: the RX char - 32 into TX, then 0 into RX
+    echo = [
+        0b0110000000000010,  # 0   @RX
+        0b1111110000010000,  # 1   D = M
+        0b0000000000000000,  # 2   @0
+        0b1110001100000010,  # 3   D;JEQ
+        0b0000000000100000,  # 4   @32
+        0b1110010011010000,  # 5   D = D - A
+        0b0110000000000001,  # 6   @TX
+        0b1110001100001000,  # 7   M = D
+        0b0110000000000010,  # 8   @RX
+        0b1110101010001000,  # 9   M = 0
+        0b0000000000000000,  # 10  @0
+        0b1110101010000111,  # 11  0;JMP
+    ]
+    # copies the timer into RAM[0]
+    clock = [
+        0b0110000000000011,  # 0   @TIMER
+        0b1111110000010000,  # 1   D = M
+        0b0000000000000000,  # 2   @0
+        0b1110001100001000,  # 3   M = D
+        0b1110101010000111,  # 4   0;JMP
+    ]
+
+    async def main():
+        machine = computer.Computer(utils.create_image(echo), compiled=True, sparse=True)
+        console = machine.attach(peripheral.SerialConsole(machine.RAM))
+        other = computer.Computer(utils.create_image(clock), compiled=True, sparse=True)
+        timer = other.attach(peripheral.Timer(other.RAM))
+
+        runtimes = [Runtime(machine), Runtime(other)]
+        runtimes[0].batch = runtimes[1].batch = 32
+        tasks = [asyncio.create_task(runtime.run()) for runtime in runtimes]
+        ticks = asyncio.create_task(tick(timer, 0.001))
+
+        console.send('nand')
+        assert await read(console, 4) == 'NAND'
+        await asyncio.sleep(0.05)
+        ticks.cancel()
+
+        for runtime in runtimes:
+            runtime.stop()
+        cycles = await asyncio.gather(*tasks)
+        assert all(cycles) and runtimes[1].cycles == cycles[1]
+        assert 0 < other.RAM.peek(0) <= timer.count
+        assert await Runtime(machine).run(100) == 100
+
+    asyncio.run(main())
+
+
+if __name__ == '__main__':
+    _runtime_test()
@@ -0,0 +1,114 @@
+"""
+The state of a computer.Computer (see Computer.snapshot / restore), and its binary file.
+
+File layout, little endian:
+    header   magic b'NAND', version, compiled, A, D, PC, PC bus, memory bus, reset, latch count
+    latches  one byte per latch bit: the (q, q_) of every SrLatchNand of the CPU, or the compiled CPU state
+    ROM, RAM run count, then (start, length, words) for every run of non zero words
+"""
+import array
+import struct
+import sys
+from collections import namedtuple
+
+MAGIC = b'NAND'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBHHHHHBI')
+_RUN = struct.Struct('<HH')
+
+# A, D, PC, the buses: unsigned 16 bit ints; latches: bytes of bits; rom, ram: array('H') of the words
+Snapshot = namedtuple('Snapshot', ['A', 'D', 'PC', 'PC_bus', 'memory_bus', 'reset', 'compiled', 'latches', 'rom', 'ram'])
+
+
+def _runs(words):
+    """
+    yields (start, array of words) for the runs of non zero words
+    """
+    start = None
+    for idx, word in enumerate(words):
+        if word and start is None:
+            start = idx
+        elif not word and start is not None:
+            yield start, words[start:idx]
+            start = None
+    if start is not None:
+        yield start, words[start:]
+
+
+def _write_words(file, words):
+    runs = list(_runs(words))
+    file.write(struct.pack('<I', len(runs)))
+    for start, run in runs:
+        if sys.byteorder == 'big':
+            run.byteswap()
+        file.write(_RUN.pack(start, len(run)))
+        file.write(run.tobytes())
+
+
+def _read_words(file, size):
+    words = array.array('H', bytes(2 * size))
+    count, = struct.unpack('<I', file.read(4))
+    for _ in range(count):
+        start, length = _RUN.unpack(file.read(_RUN.size))
+        run = array.array('H', file.read(2 * length))
+        if sys.byteorder == 'big':
+            run.byteswap()
+        words[start:start + length] = run
+    return words
+
+
+def save(snapshot, path):
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, snapshot.compiled, snapshot.A, snapshot.D, snapshot.PC,
+                                snapshot.PC_bus, snapshot.memory_bus, snapshot.reset, len(snapshot.latches)))
+        file.write(bytes(snapshot.latches))
+        _write_words(file, snapshot.rom)
+        _write_words(file, snapshot.ram)
+
+
+def load(path, size=2**15):
+    with open(path, 'rb') as file:
+        magic, version, compiled, a, d, pc, pc_bus, memory_bus, reset, latch_count = \
+            _HEADER.unpack(file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'not a snapshot file (version {VERSION}): {path}')
+        latches = file.read(latch_count)
+        rom = _read_words(file, size)
+        ram = _read_words(file, size)
+    return Snapshot(a, d, pc, pc_bus, memory_bus, reset, bool(compiled), latches, rom, ram)
+
+
+def _snapshot_test():
+    import os
+    import tempfile
+    from nandcomp import computer
+    from nandcomp import emulator
+    from nandcomp import utils
+
+    image = utils.create_image(computer.SUM100)
+    machine = computer.Computer(image, sparse=True)
+    for _ in range(200):
+        machine.step()
+    state = machine.snapshot()
+
+    path = os.path.join(tempfile.mkdtemp(), 'sum100.snapshot')
+    save(state, path)
+    assert load(path) == state
+
+    # roll back after the program finished, then continue on a machine built without the program
+    for _ in range(1000):
+        machine.step()
+    machine.restore(load(path))
+    assert machine.snapshot() == state
+
+    reference = emulator.Emulator(image)
+    reference.run(200)
+    other = computer.Computer([], sparse=True)
+    other.restore(state)
+    emulator.lockstep(other, reference, 1800)
+    assert other.RAM.peek(17) == 5050
+
+
+if __name__ == '__main__':
+    _snapshot_test()
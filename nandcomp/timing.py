@@ -0,0 +1,183 @@
+"""
+Static timing analysis of a device flattened to nands (compiler.trace).
+
+Every nand is given one unit of delay. The inputs and the state bits (latched at the previous clock)
+are available at time 0, an output settles after the longest nand path behind it.
+
+    report = timing.analyze(alu.ALU(), [0]*16, [0]*16, alu.AluFlag(*alu.zero_op))
+    print(report.text())
+    print(report.dot())                      # the critical path, for graphviz
+    timing.clock_ceiling(report.depth)       # Hz, with NAND_DELAY per nand
+
+The gates are counted after the compiler merged the shared ones and folded the constants.
+"""
+from collections import namedtuple
+
+from nandcomp import compiler
+
+# typical propagation delay of a 74HC00 nand at 5V
+NAND_DELAY = 10e-9
+
+Output = namedtuple('output', ['name', 'node', 'depth', 'nands'])
+
+
+def _named_leaves(value, name):
+    if isinstance(value, (list, tuple)):
+        names = value._fields if hasattr(value, '_fields') else range(len(value))
+        for key, v in zip(names, value):
+            yield from _named_leaves(v, f'{name}.{key}' if isinstance(key, str) else f'{name}[{key}]')
+    else:
+        yield name, value
+
+
+class Report:
+    def __init__(self, netlist):
+        self.netlist = netlist
+        self.live = netlist.live()
+
+        # depth of every node, and the operand the longest path goes through
+        self.depths = {}
+        self.previous = {}
+        for idx in self.live:
+            gate_ = netlist.nodes[idx]
+            if gate_ is None:
+                self.depths[idx] = 0
+                continue
+            a, b = gate_
+            slower = a if self.depths[a] >= self.depths[b] else b
+            self.depths[idx] = self.depths[slower] + 1
+            self.previous[idx] = slower
+
+        leaves = list(_named_leaves(netlist.outputs, 'out'))
+        leaves += [(f'next {netlist.names[node]}', after) for node, after in netlist.state]
+        self.outputs = [self._output(name, value) for name, value in leaves]
+
+    def _output(self, name, value):
+        if not isinstance(value, compiler.Wire):
+            return Output(name, None, 0, 0)
+        return Output(name, value.node, self.depths[value.node], self.cone(value.node))
+
+    def cone(self, node):
+        """
+        the number of nands node depends on, itself included
+        """
+        seen = set()
+        stack = [node]
+        while stack:
+            idx = stack.pop()
+            if idx in seen or self.netlist.nodes[idx] is None:
+                continue
+            seen.add(idx)
+            stack.extend(self.netlist.nodes[idx])
+        return len(seen)
+
+    @property
+    def depth(self):
+        return max((o.depth for o in self.outputs), default=0)
+
+    @property
+    def nand_count(self):
+        return self.netlist.nand_count
+
+    @property
+    def critical(self):
+        """
+        the output with the longest path
+        """
+        return max(self.outputs, key=lambda o: o.depth)
+
+    def path(self, output=None):
+        """
+        the nodes of the longest path into output (the critical one by default), from its source
+        """
+        output = self.critical if output is None else output
+        node = output.node
+        path = []
+        while node is not None:
+            path.append(node)
+            node = self.previous.get(node)
+        return path[::-1]
+
+    def label(self, node):
+        if self.netlist.nodes[node] is None:
+            return self.netlist.names[node]
+        return self.netlist.origins.get(node) or f'n{node}'
+
+    def text(self, outputs=True):
+        lines = [f'{self.nand_count} nands, depth {self.depth}']
+        if outputs:
+            lines.append('')
+            lines.append(f'{"output":48}{"depth":>7}{"nands":>7}')
+            lines += [f'{o.name:48}{o.depth:7}{o.nands:7}' for o in self.outputs]
+
+        critical = self.critical
+        lines.append('')
+        lines.append(f'critical path, into {critical.name}:')
+        lines += [f'{self.depths[node]:5}  {self.label(node)}' for node in self.path(critical)]
+        return '\n'.join(lines)
+
+    def dot(self, output=None):
+        """
+        graphviz source of the longest path into output (the critical one by default),
+        with the other operand of every nand on it
+        """
+        output = self.critical if output is None else output
+        path = self.path(output)
+        on_path = set(path)
+
+        lines = ['digraph critical_path {', '    rankdir=LR;', '    node [shape=box, fontsize=10];']
+        nodes = set(path)
+        edges = []
+        for node in path:
+            for operand in set(self.netlist.nodes[node] or ()):
+                nodes.add(operand)
+                edges.append((operand, node))
+        for node in sorted(nodes):
+            style = ', color=red' if node in on_path else ''
+            lines.append(f'    n{node} [label="{self.label(node)}\\n{self.depths[node]}"{style}];')
+        for a, b in edges:
+            style = ' [color=red]' if a in on_path and self.previous.get(b) == a else ''
+            lines.append(f'    n{a} -> n{b}{style};')
+        lines.append(f'    out [label="{output.name}", shape=plaintext];')
+        lines.append(f'    n{output.node} -> out [color=red];')
+        lines.append('}')
+        return '\n'.join(lines)
+
+
+def analyze(device, *args):
+    """
+    traces the device called with args (their shape, see compiler.trace) into a timing Report
+    """
+    return Report(compiler.trace(device, *args, origins=True))
+
+
+def clock_ceiling(depth, nand_delay=NAND_DELAY, memory_delay=0.0):
+    """
+    the fastest clock (Hz) a path of depth nands settles within,
+    plus the ROM and RAM access time for the Computer: a cycle reads the ROM, runs the CPU, writes the RAM
+    """
+    return 1 / (depth * nand_delay + memory_delay)
+
+
+def _timing_test():
+    from nandcomp import alu
+    from nandcomp import computer
+    from nandcomp import ops
+
+    report = analyze(alu.ALU(), [0]*16, [0]*16, alu.AluFlag(*alu.zero_op))
+    assert report.nand_count == 538
+    assert report.depth == len(report.path()) - 1
+    assert all(o.nands <= report.nand_count for o in report.outputs)
+    assert 'adder' in report.text()
+    assert report.dot().startswith('digraph')
+
+    fast = analyze(alu.ALU(ops.KoggeStone16Bit), [0]*16, [0]*16, alu.AluFlag(*alu.zero_op))
+    assert fast.depth < report.depth
+
+    cpu = analyze(computer.CPU(), [0]*16, [0]*16, 0)
+    print(cpu.text(outputs=False))
+    print(f'clock ceiling: {clock_ceiling(cpu.depth) / 1e6:.1f} MHz')
+
+
+if __name__ == '__main__':
+    _timing_test()
@@ -0,0 +1,228 @@
+"""
+Instruction trace of a computer.Computer: one fixed width binary record per cycle.
+
+    sink = trace.FileSink('add100.trace')          # or trace.RingBuffer(4096): the last 4096 cycles
+    tracer = trace.Tracer(machine, sink, pcs=range(4, 18))
+    tracer.run(2000)
+    sink.close()
+
+    for line in trace.decode(trace.read('add100.trace')):
+        print(line)
+
+    python -m nandcomp.trace add100.trace --pc 4:18
+
+File layout, little endian: header (magic b'NTRC', version, record size), then the records.
+A record is the state after the cycle of the instruction at pc: A, D, the RAM write (address, value) if any,
+and whether the jump was taken.
+"""
+import argparse
+import struct
+import sys
+from collections import namedtuple
+
+from nandcomp import compiler
+from nandcomp import decoder
+from nandcomp import utils
+
+MAGIC = b'NTRC'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBB')
+RECORD = struct.Struct('<IHHHHHHB')
+
+WRITE = 1
+JUMP = 2
+
+# flags: WRITE | JUMP, address and value are 0 when nothing was written
+Record = namedtuple('Record', ['cycle', 'pc', 'instruction', 'A', 'D', 'address', 'value', 'flags'])
+
+
+class FileSink:
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.count = 0
+
+    def append(self, *fields):
+        self.file.write(RECORD.pack(*fields))
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+class RingBuffer:
+    """
+    keeps the last capacity records in memory
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.count = 0  # records appended, including the overwritten ones
+
+    def append(self, *fields):
+        RECORD.pack_into(self.buffer, (self.count % self.capacity) * RECORD.size, *fields)
+        self.count += 1
+
+    def data(self):
+        """
+        the kept records, oldest first, as bytes
+        """
+        if self.count <= self.capacity:
+            return bytes(self.buffer[:self.count * RECORD.size])
+        split = (self.count % self.capacity) * RECORD.size
+        return bytes(self.buffer[split:] + self.buffer[:split])
+
+    def records(self):
+        return records(self.data())
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, VERSION, RECORD.size))
+            file.write(self.data())
+
+    def close(self):
+        pass
+
+
+class Tracer:
+    """
+    steps a Computer, appending a record to the sink for every cycle whose pc is in pcs (all of them by default)
+    """
+    def __init__(self, computer, sink, pcs=None):
+        self.computer = computer
+        self.sink = sink
+        self.pcs = pcs
+        self.cycles = 0
+
+        # D is followed from the instructions: it only changes on C-instructions with the D destination
+        _, d, _ = computer._registers()
+        self.D = utils.to_integer(d) & 0xFFFF
+
+    def _outputs(self):
+        cpu = self.computer.CPU
+        if isinstance(cpu, compiler.CompiledDevice):
+            return cpu.res
+        return cpu.output_write_bit, cpu.output_M, cpu.address_M, cpu.output_PC
+
+    def step(self):
+        word = lambda bits: utils.to_integer(bits) & 0xFFFF
+        computer = self.computer
+        pc = word(computer.PC_bus)
+        computer.step()
+        instruction = word(computer.ROM.res)
+        write_bit, data, address, next_pc = self._outputs()
+
+        value = None
+        if instruction & 0x8010 == 0x8010:
+            value = self.D = word(data)
+        self.cycles += 1
+        if self.pcs is not None and pc not in self.pcs:
+            return
+
+        flags = 0
+        a = word(address)
+        if write_bit:
+            flags |= WRITE
+            ram_address, ram_value = a & 0x7FFF, word(data) if value is None else value
+        else:
+            ram_address = ram_value = 0
+        if word(next_pc) != (pc + 1) & 0xFFFF:
+            flags |= JUMP
+        self.sink.append(self.cycles - 1, pc, instruction, a, self.D, ram_address, ram_value, flags)
+
+    def run(self, cycles):
+        for _ in range(cycles):
+            self.step()
+
+
+def records(data):
+    """
+    yields the Records of the bytes of a record stream
+    """
+    for fields in RECORD.iter_unpack(data):
+        yield Record(*fields)
+
+
+def read(path):
+    """
+    yields the Records of a trace file
+    """
+    with open(path, 'rb') as file:
+        magic, version, size = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION or size != RECORD.size:
+            raise ValueError(f'not a trace file (version {VERSION}): {path}')
+        data = file.read()
+    yield from records(data[:len(data) - len(data) % RECORD.size])
+
+
+def format_record(record):
+    text = decoder.decode(record.instruction).text
+    line = f'{record.cycle:8} {record.pc:5}  {text:32} A={record.A:<6} D={record.D:<6}'
+    if record.flags & WRITE:
+        line += f' M[{record.address}]={record.value}'
+    if record.flags & JUMP:
+        line += ' jump'
+    return line
+
+
+def decode(records_, pcs=None):
+    """
+    yields the human readable line of every record, of the ones whose pc is in pcs if given
+    """
+    for record in records_:
+        if pcs is None or record.pc in pcs:
+            yield format_record(record)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='prints a trace file of the nand computer')
+    parser.add_argument('path', help='trace file')
+    parser.add_argument('--pc', help='only the records with START <= pc < STOP, as START:STOP')
+    args = parser.parse_args(argv)
+
+    pcs = None
+    if args.pc:
+        start, stop = args.pc.split(':')
+        pcs = range(int(start), int(stop))
+    for line in decode(read(args.path), pcs):
+        print(line)
+
+
+def _trace_test():
+    import os
+    import tempfile
+    from nandcomp import computer
+    from nandcomp import emulator
+
+    image = utils.create_image(computer.SUM100)
+
+    # every record against the emulator
+    path = os.path.join(tempfile.mkdtemp(), 'sum100.trace')
+    sink = FileSink(path)
+    Tracer(computer.Computer(image, compiled=True, sparse=True), sink).run(400)
+    sink.close()
+    reference = emulator.Emulator(image)
+    for record in read(path):
+        assert record.pc == reference.PC
+        reference.step()
+        assert (record.A, record.D) == (reference.A, reference.D)
+        if record.flags & WRITE:
+            assert (record.address, record.value) == (reference.write_address, reference.RAM[record.address])
+        assert bool(record.flags & JUMP) == (reference.PC != (record.pc + 1) & 0xFFFF)
+    assert reference.cycles == 400
+
+    # the last records of the loop body only
+    ring = RingBuffer(8)
+    Tracer(computer.Computer(image, sparse=True), ring, pcs=range(12, 14)).run(200)
+    kept = list(ring.records())
+    assert len(kept) == 8 and ring.count > 8
+    assert all(r.pc in (12, 13) for r in kept)
+    assert [r.cycle for r in kept] == sorted(r.cycle for r in kept)
+    print('\n'.join(decode(kept)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        raise SystemExit(main())
+    _trace_test()
@@ -1,5 +1,19 @@
+import array
+
+from nandcomp import decoder
+from nandcomp import gate
+
+# the bits of every byte, msb first
+_BYTE_BITS = [[(byte >> shift) & 1 for shift in range(7, -1, -1)] for byte in range(256)]
+
+
 def to_integer(machine_number):
-    integer = sum([bit * 2 ** idx for idx, bit in enumerate(reversed(machine_number))])
+    if type(machine_number) is gate.Word:
+        integer = machine_number.value
+        return integer if integer < 0x8000 else integer - 0x10000
+    integer = 0
+    for bit in machine_number:
+        integer = integer * 2 + bit
     if machine_number[0] == 0:
         return integer
     else:
@@ -7,48 +21,44 @@ def to_integer(machine_number):
 
 
 def to_machine_number(integer):
-    if integer < 0:
-        integer = 2**16 + integer
-    return [int(bit) for bit in f'{integer:016b}']
+    integer &= 0xFFFF
+    return _BYTE_BITS[integer >> 8] + _BYTE_BITS[integer & 0xFF]
 
 
 def create_image(program):
     return [to_machine_number(i) for i in program]
 
 
-def decode_ir(instruction):
-    if instruction[0] == 0:
-        return f'A = {to_integer(instruction[1:])}'
-
-    ys = 'M[A]' if instruction[3] else 'A'
+def to_words(buses):
+    """
+    16 bit buses --> array('H') of the unsigned words
+    """
+    return array.array('H', [to_integer(bus) & 0xFFFF for bus in buses])
 
-    destination = []
-    dest_bits = instruction[10:13]
-    if dest_bits[0] == 1:
-        destination.append('A')
-    if dest_bits[1] == 1:
-        destination.append('D')
-    if dest_bits[2] == 1:
-        destination.append('M[A]')
 
-    dest_str = ', '.join(destination)
-    dest_str = dest_str if dest_str else 'NULL'
+def to_bit_matrix(words):
+    """
+    unsigned words --> numpy uint8 array of shape (len(words), 16), a bus per row (needs numpy)
+    """
+    import numpy as np
+    words = np.asarray(words, dtype='>u2')
+    return np.unpackbits(words.view(np.uint8)).reshape(-1, 16)
 
-    alu_bits = instruction[4:10]
-    jump_bits = instruction[13:16]
 
-    xs = '0' if alu_bits[0] else 'D'
-    xs_sign = '!' if alu_bits[1] else ''
-    ys = '0' if alu_bits[2] else ys
-    ys_sign = '!' if alu_bits[3] else ''
-    op = '+' if alu_bits[4] else '&'
+def from_bit_matrix(matrix):
+    """
+    numpy array of buses, a bus per row --> numpy uint16 array of the unsigned words (needs numpy)
+    """
+    import numpy as np
+    return np.packbits(np.asarray(matrix, dtype=np.uint8), axis=1).view('>u2').ravel().astype(np.uint16)
 
-    jump = ''.join(str(j) for j in jump_bits) if any(jump_bits) else ''
 
-    if alu_bits[5]:
-        return f'{dest_str} = !({xs_sign}{xs} {op} {ys_sign}{ys}); {jump}'
-    else:
-        return f'{dest_str} = {xs_sign}{xs} {op} {ys_sign}{ys}; {jump}'
+def decode_ir(instruction):
+    """
+    the assembly text of an instruction (bus or unsigned int), see decoder.py
+    """
+    word = instruction if isinstance(instruction, int) else to_integer(instruction)
+    return decoder.decode(word).text
 
 
 def _show_num_convert():
@@ -126,6 +136,28 @@ def _show_decode():
         print(idx, '\t', decode_ir(m))
 
 
+def _conversion_test():
+    for integer in range(-2**15, 2**16, 3):
+        bits = to_machine_number(integer)
+        assert bits == [int(bit) for bit in f'{integer & 0xFFFF:016b}']
+        assert to_integer(bits) == (integer & 0xFFFF) - ((integer & 0x8000) << 1)
+        word, from_bits = gate.Word(integer & 0xFFFF), gate.Word.from_bits(bits)
+        assert to_integer(word) == to_integer(from_bits) == to_integer(bits)
+        assert list(word) == bits and from_bits.value == integer & 0xFFFF
+        assert word == from_bits and hash(word) == hash(from_bits) and word != bits
+
+    words = [0, 1, 0x8000, 0xFFFF, 12345]
+    assert list(to_words(create_image(words))) == words
+    try:
+        matrix = to_bit_matrix(words)
+    except ImportError:
+        pass
+    else:
+        assert matrix.tolist() == create_image(words)
+        assert from_bit_matrix(matrix).tolist() == words
+
+
 if __name__ == '__main__':
+    _conversion_test()
     _show_num_convert()
     _show_decode()
@@ -0,0 +1,173 @@
+"""
+Levelized nand netlists, evaluated with numpy over a batch of input vectors.
+
+Every wire is a row of packed bits (8 vectors per byte), and every topological level
+of the netlist is a single gather + bitwise_and + invert over all the rows of that level.
+
+    batch = BatchALU()
+    res, is_zero, is_negative = batch(xs, ys, alu.x_plus_y_op)
+"""
+import numpy as np
+
+from nandcomp import alu
+from nandcomp import compiler
+
+
+def levelize(netlist):
+    """
+    groups the live nands of the netlist by depth
+
+    returns the (live nodes, levels) pair, where live nodes[i] is the netlist node stored in row i,
+    and levels is a list of (input_a, input_b, output) row index arrays
+    """
+    live = netlist.live()
+    row = {node: idx for idx, node in enumerate(live)}
+
+    depth = {}
+    levels = []
+    for node in live:
+        gate_ = netlist.nodes[node]
+        if gate_ is None:
+            depth[node] = 0
+            continue
+        a, b = gate_
+        depth[node] = 1 + max(depth[a], depth[b])
+        if depth[node] > len(levels):
+            levels.append(([], [], []))
+        level = levels[depth[node] - 1]
+        level[0].append(row[a])
+        level[1].append(row[b])
+        level[2].append(row[node])
+
+    levels = [tuple(np.array(idx, dtype=np.intp) for idx in level) for level in levels]
+    return live, levels
+
+
+class LevelizedNetlist:
+    def __init__(self, netlist):
+        self.netlist = netlist
+        self.live, self.levels = levelize(netlist)
+        row = {node: idx for idx, node in enumerate(self.live)}
+
+        # unused inputs are dropped from the netlist, they are evaluated into a scratch row
+        self._scratch = len(self.live)
+        self.inputs = [row.get(w.node, self._scratch) for w in compiler.leaves(netlist.inputs)]
+        self.state = [row.get(node, self._scratch) for node, _ in netlist.state]
+
+        # (row, None) for a wire, (None, 0 or 1) for a constant
+        outputs = list(compiler.leaves(netlist.outputs)) + [after for _, after in netlist.state]
+        self.outputs = [(row[w.node], None) if isinstance(w, compiler.Wire) else (None, w) for w in outputs]
+
+    def evaluate(self, inputs, state=None):
+        """
+        :param inputs: packed bit rows (uint8), one per input bit of the device, in argument order
+        :param state: packed bit rows, one per state bit of the netlist
+        :return: packed bit rows, one per output bit, followed by the next state rows
+        """
+        inputs = np.asarray(inputs, dtype=np.uint8)
+        values = np.zeros((len(self.live) + 1, inputs.shape[-1]), dtype=np.uint8)
+        values[self.inputs] = inputs
+        if self.state:
+            values[self.state] = np.asarray(state, dtype=np.uint8)
+
+        for a, b, out in self.levels:
+            values[out] = np.invert(np.bitwise_and(values[a], values[b]))
+
+        res = np.empty((len(self.outputs), values.shape[1]), dtype=np.uint8)
+        for idx, (out, const) in enumerate(self.outputs):
+            res[idx] = values[out] if out is not None else 0xFF * const
+        return res
+
+
+def to_rows(words, width=16):
+    """
+    integer array --> packed bit rows, msb first (the bus order)
+    """
+    words = np.asarray(words, dtype=np.int64)
+    bits = np.stack([(words >> (width - 1 - k)) & 1 for k in range(width)]).astype(np.uint8)
+    return np.packbits(bits, axis=-1)
+
+
+def from_rows(rows, count, signed=True):
+    """
+    packed bit rows, msb first --> integer array
+    """
+    bits = np.unpackbits(rows, axis=-1, count=count).astype(np.int64)
+    width = len(rows)
+    words = np.zeros(count, dtype=np.int64)
+    for k in range(width):
+        words |= bits[k] << (width - 1 - k)
+    if signed:
+        words -= (words >> (width - 1)) << width
+    return words
+
+
+class BatchALU:
+    """
+    alu.ALU over arrays of operands
+    """
+    def __init__(self):
+        netlist = compiler.trace(alu.ALU(), [0]*16, [0]*16, alu.AluFlag(*alu.zero_op))
+        self.netlist = LevelizedNetlist(netlist)
+
+    def __call__(self, xs, ys, flags):
+        """
+        :param xs, ys: integer arrays of 16 bit operands
+        :param flags: one alu flag tuple for the whole batch, or an (n, 6) array of them
+        :return: result (int16), is_zero, is_negative (uint8) arrays
+        """
+        xs = np.asarray(xs)
+        count = len(xs)
+        flags = np.broadcast_to(np.asarray(flags, dtype=np.int64), (count, 6)).T
+        inputs = np.concatenate([to_rows(xs), to_rows(ys), to_rows(flags, 1).reshape(6, -1)])
+        outputs = self.netlist.evaluate(inputs)
+
+        res = from_rows(outputs[:16], count).astype(np.int16)
+        is_zero = np.unpackbits(outputs[16], count=count)
+        is_negative = np.unpackbits(outputs[17], count=count)
+        return res, is_zero, is_negative
+
+
+def sweep(flags, chunk=2**20):
+    """
+    yields (xs, ys, result, is_zero, is_negative) for every (x, y) pair of 16 bit operands
+    """
+    batch = BatchALU()
+    pairs = np.arange(chunk, dtype=np.int64)
+    for start in range(0, 2**32, chunk):
+        xs = ((start + pairs) >> 16) - 2**15
+        ys = ((start + pairs) & 0xFFFF) - 2**15
+        yield (xs, ys) + batch(xs, ys, flags)
+
+
+def _batch_test():
+    def wrap(values):
+        return ((np.asarray(values) + 2**15) % 2**16) - 2**15
+
+    rng = np.random.default_rng(0)
+    xs = rng.integers(-2**15, 2**15, 10000)
+    ys = rng.integers(-2**15, 2**15, 10000)
+    batch = BatchALU()
+
+    expected = {
+        alu.x_plus_y_op: xs + ys,
+        alu.x_minus_y_op: xs - ys,
+        alu.y_minus_x_op: ys - xs,
+        alu.x_and_y_op: xs & ys,
+        alu.x_or_y_op: xs | ys,
+        alu.minus_x_op: -xs,
+        alu.not_y_op: ~ys,
+        alu.one_op: np.ones_like(xs),
+    }
+    for flags, values in expected.items():
+        res, is_zero, is_negative = batch(xs, ys, flags)
+        assert (res == wrap(values)).all()
+        assert (is_zero == (res == 0)).all()
+        assert (is_negative == (res < 0)).all()
+
+    xs, ys, res, _, _ = next(sweep(alu.x_plus_y_op, chunk=2**16))
+    assert (res == wrap(xs + ys)).all()
+
+
+if __name__ == '__main__':
+    _batch_test()
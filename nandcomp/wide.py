@@ -0,0 +1,217 @@
+"""
+Wide mode: every wire carries one bit per simulated machine.
+
+Bit i of each wire belongs to machine (lane) i, so a single pass through the gates
+steps all the machines at once. The nand becomes `HIGH - (x & y)`, i.e. ~(x & y) & mask.
+
+    with wide.lanes(64):
+        a = alu.ALU()
+        res, zr, ng = a(wide.pack_numbers(xs), wide.pack_numbers(ys), wide.pack_flags(flags))
+        results = wide.unpack_numbers(res)
+
+Devices have to be constructed and used inside the same mode (latches start as HIGH).
+"""
+import contextlib
+
+from nandcomp import alu
+from nandcomp import computer
+from nandcomp import cu
+from nandcomp import gate
+from nandcomp import memory
+from nandcomp import peripheral
+from nandcomp import utils
+
+
+def set_lanes(n):
+    gate.HIGH = (1 << n) - 1
+
+
+def lane_count():
+    return gate.HIGH.bit_length()
+
+
+@contextlib.contextmanager
+def lanes(n):
+    previous = gate.HIGH
+    set_lanes(n)
+    try:
+        yield
+    finally:
+        gate.HIGH = previous
+
+
+def pack(bits):
+    """
+    [lane0 bit, lane1 bit, ...] --> wire
+    """
+    word = 0
+    for idx, bit in enumerate(bits):
+        word |= bit << idx
+    return word
+
+
+def unpack(word, n=None):
+    n = lane_count() if n is None else n
+    return [(word >> idx) & 1 for idx in range(n)]
+
+
+def pack_bus(buses):
+    """
+    one bus per lane --> one bus of wires
+    """
+    return [pack(column) for column in zip(*buses)]
+
+
+def unpack_bus(bus, n=None):
+    n = lane_count() if n is None else n
+    return [[(word >> idx) & 1 for word in bus] for idx in range(n)]
+
+
+def pack_numbers(integers):
+    return pack_bus([utils.to_machine_number(i) for i in integers])
+
+
+def unpack_numbers(bus, n=None):
+    return [utils.to_integer(b) for b in unpack_bus(bus, n)]
+
+
+def pack_flags(flags):
+    """
+    one alu flag tuple per lane --> alu.AluFlag of wires
+    """
+    return alu.AluFlag(*(pack(column) for column in zip(*flags)))
+
+
+class Memory(memory.Memory):
+    """
+    One bit-sliced cell array shared by the lanes, every lane reading and writing its own address.
+    Lanes pointing at the same address share a single cell access, with the write bit masked to them.
+    """
+    def _addresses(self):
+        size = len(self.memory)
+        groups = {}
+        for lane in range(lane_count()):
+            bits = [(word >> lane) & 1 for word in self.address]
+            idx = utils.to_integer(bits) % size
+            groups[idx] = groups.get(idx, 0) | (1 << lane)
+        return groups
+
+    def _wiring(self):
+        res = [0] * 16
+        for idx, mask in self._addresses().items():
+            write = self.write & mask
+            cell = self._cell(idx, write)(self.data, write)
+            res = [r | (c & mask) for r, c in zip(res, cell)]
+        return res
+
+
+class ROM(Memory):
+    def __init__(self, images, sparse=False):
+        super().__init__(sparse=sparse)
+        if len(images) > lane_count() or max(len(i) for i in images) > len(self.memory):
+            raise ValueError
+
+        zero = [0] * 16
+        for idx in range(max(len(i) for i in images)):
+            data = pack_bus([i[idx] if idx < len(i) else zero for i in images])
+            if self.sparse and not any(data):
+                continue
+            self._cell(idx, gate.HIGH)(data, gate.HIGH)
+
+    def __call__(self, address):
+        self.address = address
+        self.step()
+        return self.res
+
+
+class RAM(Memory):
+    def __init__(self, sparse=False):
+        super().__init__(sparse=sparse)
+
+    def __call__(self, address, data, write_enable):
+        self.address = address
+        self.data = data
+        self.write = write_enable
+        self.step()
+        return self.res
+
+
+class Computer(computer.Computer):
+    """
+    One Computer per image, stepped together. Has to be created inside lanes(n), with n >= len(images).
+    """
+    def __init__(self, images, sparse=False):
+        self.reset = 0
+        self.PC_bus = [0] * 16
+        self.memory_bus = [0] * 16
+
+        self.ROM = ROM(images, sparse)
+        self.RAM = RAM(sparse)
+        self.CPU = computer.CPU()
+
+        self.keyboard = peripheral.Keyboard(self.RAM)
+        self.screen = peripheral.Screen(self.RAM)
+        # the memory mapped devices read and write scalar words, they are not updated in wide mode
+        self.devices = []
+        self.write_address = None
+
+    def _wiring(self):
+        instruction = self.ROM(self.PC_bus)
+        write_bit, data, address, pc = self.CPU(instruction, self.memory_bus, self.reset)
+        # write_bit and address are per lane: no scalar write address, no device dispatch
+        self.memory_bus = self.RAM(address, data, write_bit)
+        self.PC_bus = pc
+
+    def read(self, address):
+        """
+        RAM[address] of every lane, as integers
+        """
+        return unpack_numbers(self.RAM.memory[address].res)
+
+
+def _wide_test():
+    import random
+
+    n = 64
+    flags = [getattr(alu, name) for name in dir(alu) if name.endswith('_op')]
+    xs = [random.randint(-2**15, 2**15 - 1) for _ in range(n)]
+    ys = [random.randint(-2**15, 2**15 - 1) for _ in range(n)]
+    fs = [random.choice(flags) for _ in range(n)]
+
+    narrow = alu.ALU()
+    expected = [narrow(utils.to_machine_number(x), utils.to_machine_number(y), alu.AluFlag(*f))
+                for x, y, f in zip(xs, ys, fs)]
+
+    with lanes(n):
+        a = alu.ALU()
+        res, is_zero, is_negative = a(pack_numbers(xs), pack_numbers(ys), pack_flags(fs))
+        counter = cu.ProgramCounter()
+        for _ in range(3):
+            pc = counter(gate.HIGH, 0, [0] * 16, 0)
+
+    assert unpack_bus(res, n) == [e[0] for e in expected]
+    assert unpack(is_zero, n) == [e[1] for e in expected]
+    assert unpack(is_negative, n) == [e[2] for e in expected]
+    assert unpack_numbers(pc, n) == [3] * n
+
+    # a machine per lane: RAM[16] = k, RAM[17] = k + 2
+    images = [utils.create_image([
+        k,                   # @k
+        0b1110110000010000,  # D = A
+        0b0000000000010000,  # @16
+        0b1110001100001000,  # M = D
+        0b0000000000000010,  # @2
+        0b1110000010010000,  # D = D + A
+        0b0000000000010001,  # @17
+        0b1110001100001000,  # M = D
+    ]) for k in range(4)]
+    with lanes(len(images)):
+        machine = Computer(images, sparse=True)
+        for _ in range(len(images[0])):
+            machine.step()
+        assert machine.read(16) == [0, 1, 2, 3]
+        assert machine.read(17) == [2, 3, 4, 5]
+
+
+if __name__ == '__main__':
+    _wide_test()